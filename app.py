@@ -1,21 +1,11 @@
 import streamlit as st
-import json
 import time
-from pathlib import Path
-from datetime import date, datetime
-import os
-from zoneinfo import ZoneInfo
 
-IST = ZoneInfo("Asia/Kolkata")
-
-from src.penalties import (
-    get_duration_factor,
-    get_activity_factor,
-    get_time_penalty,
-)
-from src.exposure import compute_exposure_score
-from src.windows import generate_time_windows
-from src.ranker import label_windows
+from src.aqi_store import get_store
+from src.climatology import get_climatology
+from src.engine import DEFAULT_LOCATION, ist_now, recommend
+from src.rec_cache import get_recommendation_cache
+from src.sketch import get_score_sketches
 
 
 
@@ -74,19 +64,26 @@ analyze = st.button("Analyze safest time")
 # Load AQI data (read-only)
 
 
-JSON_PATH = Path("data/delhi_hourly_aqi.json")
+# Loaded once per process and hot-reloaded when the fetch job rewrites the file
+store = get_store()
 
-if not JSON_PATH.exists():
+# Only one location is fetched so far
+location = DEFAULT_LOCATION
+
+if store.version is None:
     st.error("AQI data not found. Please run the daily fetch job first.")
     st.stop()
 
-with open(JSON_PATH, "r") as f:
-    hourly_aqi = json.load(f)["data"]
+now = ist_now()
+today = now.strftime("%Y-%m-%d")
 
-today = date.today().strftime("%Y-%m-%d")
-hourly_aqi = [h for h in hourly_aqi if h.get("date") == today]
+# Typical AQI by hour/weekday/month from history; ranks the day when
+# today's forecast is missing
+climatology = get_climatology()
 
-if not hourly_aqi:
+if not store.for_date(today, location=location) and not (
+    climatology and climatology.for_date(today, location=location)
+):
     st.error("No AQI data available for today.")
     st.stop()
 
@@ -96,53 +93,28 @@ if analyze:
     with st.spinner("Analyzing air quality…"):
         time.sleep(0.5)
 
+        # Shared engine; results are cached across sessions and a new
+        # snapshot version invalidates them
+        status, ranked = recommend(
+            duration,
+            activity,
+            source=store,
+            clock=ist_now,
+            location=location,
+            cache=get_recommendation_cache(),
+            fallback=climatology,
+            sketches=get_score_sketches(),
+        )
 
-        # Compute factors
-
-        duration_factor = get_duration_factor(duration)
-        activity_factor = get_activity_factor(activity)
-
-        # Generate windows
-
-        windows = generate_time_windows(hourly_aqi, duration)
+        if status == "no_data":
+            st.error("No AQI data available for today.")
+            st.stop()
 
-        if not windows:
+        if status == "no_windows":
             st.error("No valid time windows found for today.")
             st.stop()
 
-
-        # Compute exposure
-
-        for w in windows:
-            hour_penalties = [get_time_penalty(h) for h in w["hours"]]
-            time_penalty = sum(hour_penalties) / len(hour_penalties)
-
-            w["exposure"] = compute_exposure_score(
-                w["avg_aqi"],
-                duration_factor,
-                activity_factor,
-                time_penalty,
-            )
-
-        # Normalize exposure
-
-        max_exposure = max(w["exposure"] for w in windows)
-
-        for w in windows:
-            w["NormalizedScore"] = round(
-                (w["exposure"] / max_exposure) * 100, 1
-            )
-
-        # Filter future-only windows
-       
-        current_hour = datetime.now(IST).hour
-
-        windows = [
-            w for w in windows
-            if w["start_hour"] >= current_hour
-        ]
-
-        if not windows:
+        if status == "none_remaining":
             st.warning(
                 "⚠️ No safe outdoor windows remain today.\n\n"
                 "Pollution levels stay high for the rest of the day. "
@@ -150,13 +122,9 @@ if analyze:
             )
             st.stop()
 
-        # Rank & label
-        windows = sorted(windows, key=lambda x: x["exposure"])
-        windows = label_windows(windows)
-
-        best = windows[0]
-        worst = windows[-1]
-        is_last_window = len(windows) == 1
+        best = ranked.best()[0]
+        worst = ranked.worst()[0]
+        is_last_window = len(ranked) == 1
         risk_multiplier = round(
             worst["exposure"] / best["exposure"], 1
         )
@@ -164,6 +132,13 @@ if analyze:
     # RESULTS
 
     st.markdown("---")
+
+    if status == "climatology":
+        st.info(
+            "Today's forecast isn't available yet, so these windows are ranked "
+            "on typical air quality for past days like today."
+        )
+
     st.markdown("### ✅ Best time to go out (from now)")
 
     st.markdown(
@@ -200,6 +175,22 @@ if analyze:
     "Higher duration or activity increases this value."
     )
 
+    typical = climatology and climatology.typical(
+        location, best["start_hour"], now.weekday(), now.month
+    )
+    if typical and status == "ok":
+        # say which history the figure pools; sparse cells fall back to coarser ones
+        aqi, pool = typical
+        when = {
+            "hour_weekday_month": f"on a {now:%A} in {now:%B}",
+            "hour_month": f"in {now:%B}",
+            "hour": "across all days",
+        }[pool]
+        st.caption(
+            f"Typical AQI at {best['start_hour']}:00 {when}: "
+            f"~{round(aqi)} (today: {round(best['avg_aqi'])})"
+        )
+
     st.markdown("**Why this window:**")
     st.markdown(
         "- Lower pollution compared to other remaining hours\n"
@@ -283,7 +274,12 @@ if analyze:
     # Show all windows along with risks
 
     with st.expander("Show all remaining windows"):
-        for w in windows:
+        if ranked.labeler is not None:
+            st.caption(
+                "Labels compare each window with past days for this duration "
+                "and activity, not just with the rest of today."
+            )
+        for w in ranked:
             st.write(
                 f"{w['start_hour']}:00–{w['end_hour']}:00 · "
                 f"Score {w['NormalizedScore']}  "
@@ -0,0 +1,181 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import HORIZONS, all_profiles, synthetic_hourly_aqi, synthetic_locations
+from src.engine import IST, StaticSource, recommend
+from src.exposure import score_profiles
+from src.penalties import get_time_penalty, time_penalty_array
+from src.ranker import label_windows
+from src.windows import generate_time_windows, generate_windows_by_timestamp
+
+
+PRESETS = {
+    "quick": {"horizons": ["24h", "72h"], "locations": [1, 10]},
+    "full": {"horizons": ["24h", "72h", "1y"], "locations": [1, 100, 10000]},
+}
+
+DEFAULT_THRESHOLD = 0.2
+
+# Committed quick-preset run to compare against (--compare)
+BASELINE_PATH = Path(__file__).parent / "baseline_quick.json"
+
+
+def time_call(fn, repeat: int = 5, min_time: float = 0.05) -> dict:
+    # Calibrate the inner loop so each sample runs for at least min_time.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _days(rows) -> list:
+    # the per-day engines take one day's rows at a time
+    days = {}
+    for r in rows:
+        days.setdefault(r["date"], []).append(r)
+    return list(days.values())
+
+
+def build_cases(preset: str) -> dict:
+    cfg = PRESETS[preset]
+    cases = {}
+
+    for horizon in cfg["horizons"]:
+        rows = synthetic_hourly_aqi(HORIZONS[horizon])
+        days = _days(rows)
+        hours = np.array([r["hour"] for r in rows], dtype=np.float64)
+
+        # every case covers the whole horizon; per-day engines run day by day
+        cases[f"generate_time_windows/{horizon}/60min"] = (
+            lambda days=days: [generate_time_windows(day, 60) for day in days]
+        )
+        cases[f"generate_windows_by_timestamp/{horizon}/120min"] = (
+            lambda rows=rows: generate_windows_by_timestamp(rows, 120)
+        )
+        cases[f"score_profiles/{horizon}/all_profiles"] = (
+            lambda days=days: [score_profiles(day, all_profiles()) for day in days]
+        )
+
+        exposures = [{"exposure": float(a["aqi"])} for a in rows]
+        cases[f"label_windows/{horizon}"] = lambda exposures=exposures: label_windows(exposures)
+
+        cases[f"get_time_penalty/{horizon}/scalar"] = (
+            lambda hours=hours.tolist(): [get_time_penalty(h) for h in hours]
+        )
+        cases[f"time_penalty_array/{horizon}"] = lambda hours=hours: time_penalty_array(hours)
+
+    clock = lambda: datetime(2026, 1, 1, 0, tzinfo=IST)
+    for n in cfg["locations"]:
+        rows = synthetic_locations(n)
+        source = StaticSource(rows)
+        locations = [f"loc{i}" for i in range(n)]
+
+        def end_to_end(source=source, locations=locations):
+            for location in locations:
+                for p in all_profiles():
+                    recommend(
+                        p["duration"], p["activity"], source=source, clock=clock,
+                        location=location, artifact_path=None,
+                    )
+
+        cases[f"recommend/24h/{n}_locations/all_profiles"] = end_to_end
+
+    return cases
+
+
+def run(preset: str = "quick", only: str = None, repeat: int = 5) -> dict:
+    results = {}
+    for name, fn in build_cases(preset).items():
+        if only and only not in name:
+            continue
+        results[name] = time_call(fn, repeat=repeat)
+        print(f"{name:60s} {results[name]['median_s'] * 1e3:10.3f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "preset": preset,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    # Returns one row per benchmark present in both runs; a row is a
+    # regression when the median got slower by more than `threshold`.
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_s": base["median_s"],
+            "current_s": cur["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the windowing, scoring and ranking hot paths.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument(
+        "--compare", type=Path, nargs="?", const=BASELINE_PATH,
+        help=f"baseline results file to compare against (default {BASELINE_PATH.name})",
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before flagging a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    current = run(args.preset, only=args.only, repeat=args.repeat)
+    args.output.write_text(json.dumps(current, indent=2))
+
+    if args.compare is None:
+        return 0
+
+    rows = compare_results(current, json.loads(args.compare.read_text()), args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['name']:60s} x{row['ratio']:6.2f}  {flag}")
+
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
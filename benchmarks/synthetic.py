@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.penalties import ACTIVITY_FACTORS
+
+
+HORIZONS = {"24h": 24, "72h": 72, "1y": 365 * 24}
+DURATIONS = [15, 30, 45, 60, 90, 120]
+ACTIVITIES = list(ACTIVITY_FACTORS)
+
+
+def synthetic_hourly_aqi(hours: int, location: str = "delhi", start: str = "2026-01-01", seed: int = 0) -> list:
+    # Diurnal AQI curve (morning and evening peaks) plus noise, as rows in the
+    # same shape the fetch job writes.
+    rng = np.random.default_rng(seed)
+    ts = np.arange(hours)
+    hour_of_day = ts % 24
+    base = 150 + 60 * np.sin((hour_of_day - 3) / 24 * 2 * np.pi) + 40 * np.sin(hour_of_day / 12 * 2 * np.pi)
+    aqi = np.clip(base + rng.normal(0, 25, hours), 0, 500).astype(int)
+    dates = (np.datetime64(start) + (ts // 24)).astype(str)
+
+    return [
+        {"location": location, "date": d, "hour": int(h), "aqi": int(a)}
+        for d, h, a in zip(dates.tolist(), hour_of_day.tolist(), aqi.tolist())
+    ]
+
+
+def synthetic_locations(n_locations: int, hours: int = 24, seed: int = 0) -> list:
+    rows = []
+    for i in range(n_locations):
+        rows.extend(synthetic_hourly_aqi(hours, location=f"loc{i}", seed=seed + i))
+    return rows
+
+
+def all_profiles() -> list:
+    return [{"duration": d, "activity": a} for d in DURATIONS for a in ACTIVITIES]
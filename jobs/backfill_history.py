@@ -0,0 +1,50 @@
+import argparse
+import sys
+
+from src import metrics
+from src.backfill import CHECKPOINT_PATH, DEFAULT_CHUNK_DAYS, backfill_history
+from src.climatology import update_climatology
+from src.sketch import update_score_sketches
+from jobs.daily_fetch import LOCATIONS
+
+
+def run(start: str, end: str, checkpoint=CHECKPOINT_PATH, **options) -> dict:
+    report = backfill_history(LOCATIONS, start, end, checkpoint_path=checkpoint, **options)
+
+    print(
+        f"Backfilled {report['rows']} rows in {report['units'] - len(report['failed'])} chunks "
+        f"({report['skipped']} already done)"
+    )
+    for key, error in sorted(report["failed"].items()):
+        print(f"chunk {key} failed: {error}", file=sys.stderr)
+
+    if report["rows"]:
+        # backfilled days sit below the nightly watermarks; recount them
+        update_climatology(root=options.get("root"), rebuild=True)
+        update_score_sketches(root=options.get("root"), rebuild=True)
+    return report
+
+
+if __name__ == "__main__":
+    # Re-running with the same arguments resumes from the checkpoint file
+    parser = argparse.ArgumentParser(description="Backfill historical hourly AQI into data/history.")
+    parser.add_argument("start", help="first date, YYYY-MM-DD")
+    parser.add_argument("end", help="last date, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--chunk-days", type=int, default=DEFAULT_CHUNK_DAYS)
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=10.0, help="max weighted API calls per second")
+    parser.add_argument("--checkpoint", default=str(CHECKPOINT_PATH))
+    parser.add_argument("--no-compact", action="store_true", help="leave appended part files uncompacted")
+    args = parser.parse_args()
+
+    with metrics.profiled():
+        report = run(
+            args.start,
+            args.end,
+            checkpoint=args.checkpoint,
+            chunk_days=args.chunk_days,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            compact=not args.no_compact,
+        )
+    sys.exit(1 if report["failed"] else 0)
@@ -0,0 +1,30 @@
+import argparse
+
+from src.history_store import compact_history, import_legacy_parquet
+
+
+def run(import_legacy: bool = False, min_files: int = 2):
+    if import_legacy:
+        imported = import_legacy_parquet()
+        print(f"Imported {imported} legacy rows")
+
+    compacted = compact_history(min_files=min_files)
+    print(f"Compacted {compacted} partitions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the partitioned AQI history.")
+    parser.add_argument(
+        "--import-legacy",
+        action="store_true",
+        help="first load data/delhi_hourly_aqi.parquet into the partitioned layout",
+    )
+    parser.add_argument(
+        "--min-files",
+        type=int,
+        default=2,
+        help="only compact partitions with at least this many part files",
+    )
+    args = parser.parse_args()
+
+    run(import_legacy=args.import_legacy, min_files=args.min_files)
@@ -1,4 +1,14 @@
-from src.aqi_api import fetch_and_store_hourly_city_aqi
+import argparse
+import sys
+
+from jobs.migrate_history_v2 import run as migrate_history
+from src import metrics
+from src.aqi_api import DEFAULT_LOCATION, store_hourly_aqi
+from src.climatology import update_climatology
+from src.sketch import update_score_sketches
+from src.fetch_scheduler import fetch_hourly_aqi_concurrent
+from src.precompute import write_recommendation_artifact
+from src.snapshot import ARROW_PATH, ArrowSnapshot
 from datetime import datetime
 import pytz
 
@@ -8,8 +18,65 @@ import pytz
 # today = now_ist.strftime("%Y-%m-%d")
 # current_hour = now_ist.hour
 
-def run():
-    fetch_and_store_hourly_city_aqi()
+# Every location fetched by the nightly job; chunks are fetched concurrently.
+LOCATIONS = [
+    DEFAULT_LOCATION,
+]
+
+
+def _previous_rows(names, path=ARROW_PATH) -> list:
+    # Last good rows for locations whose fetch failed, so a partial run
+    # doesn't drop them from the snapshot.
+    if not names or not path.exists():
+        return []
+    snapshot = ArrowSnapshot(path)
+    return [
+        row
+        for location, day in snapshot.keys()
+        if location in names
+        for row in snapshot.rows(location, day)
+    ]
+
+
+def run(export_json: bool = False, **fetch_options) -> bool:
+    # Storage schema v2 before anything is stored; a no-op once migrated
+    migrate_history(remove_legacy=True)
+
+    report = fetch_hourly_aqi_concurrent(LOCATIONS, **fetch_options)
+    for name, error in sorted(report.failed.items()):
+        print(f"fetch failed for {name}: {error}", file=sys.stderr)
+    if not report.results:
+        raise RuntimeError("AQI fetch failed for every location")
+
+    store_hourly_aqi(report.rows() + _previous_rows(set(report.failed)), export_json=export_json)
+
+    # Fold history up to the start of today into the hour x weekday x month
+    # index and the per-profile score sketches
+    update_climatology()
+    update_score_sketches()
+
+    # Rank every (day, duration, activity, hour) now so readers only slice
+    write_recommendation_artifact()
+    return report.complete
 
 if __name__ == "__main__":
-    run()
+    # WTGO_METRICS / WTGO_PROFILE turn on stage timings / cProfile output
+    parser = argparse.ArgumentParser(description="Fetch AQI and rebuild the snapshot.")
+    parser.add_argument(
+        "--export-json",
+        action="store_true",
+        help="also write the indented JSON snapshot (the app reads the Arrow file)",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=10.0, help="max weighted API calls per second")
+    parser.add_argument("--attempts", type=int, default=4, help="tries per request")
+    args = parser.parse_args()
+
+    with metrics.profiled():
+        # partial results are stored and committed; failures are only logged
+        run(
+            export_json=args.export_json,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            attempts=args.attempts,
+        )
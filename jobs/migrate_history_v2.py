@@ -0,0 +1,117 @@
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+from src.aqi_api import JSON_PATH
+from src.climatology import CLIMATOLOGY_PATH, update_climatology
+from src.history_store import (
+    HISTORY_DIR,
+    LEGACY_PARQUET_PATH,
+    SCHEMA_VERSION,
+    import_legacy_parquet,
+    read_v1_partitions,
+    upsert_hourly_aqi,
+)
+from src.locations import DEFAULT_LOCATION
+from src.sketch import SKETCHES_PATH, update_score_sketches
+from src.snapshot import ARROW_PATH, ArrowSnapshot, write_arrow_snapshot
+
+
+# One-shot move to storage schema v2 (see history_store / snapshot). Later
+# sources win: legacy single parquet < JSON export < v1 history partitions.
+# A marker file in the history root makes re-runs a no-op.
+MARKER_NAME = "_SCHEMA_VERSION"
+
+
+def migrate_v1_history(root: Path = HISTORY_DIR) -> int:
+    # Partitions come location by location; upsert one location at a time so
+    # each month file is rewritten once instead of once per day.
+    migrated = 0
+    pending, pending_dirs, current = [], [], None
+
+    def flush():
+        upsert_hourly_aqi(pending, root=root)
+        for part in pending_dirs:
+            shutil.rmtree(part)
+
+    for part, rows in read_v1_partitions(root):
+        if part.parent != current and pending_dirs:
+            flush()
+            pending, pending_dirs = [], []
+        current = part.parent
+        pending.extend(rows)
+        pending_dirs.append(part)
+        migrated += len(rows)
+    if pending_dirs:
+        flush()
+    return migrated
+
+
+def migrate_json(json_path: Path = JSON_PATH, root: Path = HISTORY_DIR, arrow_path: Path = ARROW_PATH) -> int:
+    if not Path(json_path).exists():
+        return 0
+    payload = json.loads(Path(json_path).read_text())
+    rows = [{"location": DEFAULT_LOCATION, **row} for row in payload.get("data", [])]
+    upsert_hourly_aqi(rows, root=root)
+
+    if not Path(arrow_path).exists():
+        write_arrow_snapshot(rows, payload.get("fetched_at"), path=arrow_path)
+    return len(rows)
+
+
+def migrate_snapshot(arrow_path: Path = ARROW_PATH) -> bool:
+    # rewrite an existing Arrow snapshot with the v2 column types
+    if not Path(arrow_path).exists():
+        return False
+    snapshot = ArrowSnapshot(arrow_path)
+    rows, fetched_at = snapshot.all_rows(), snapshot.fetched_at
+    del snapshot  # release the memory map before replacing the file
+    write_arrow_snapshot(rows, fetched_at, path=arrow_path)
+    return True
+
+
+def run(
+    root: Path = HISTORY_DIR,
+    legacy_parquet: Path = LEGACY_PARQUET_PATH,
+    json_path: Path = JSON_PATH,
+    arrow_path: Path = ARROW_PATH,
+    remove_legacy: bool = False,
+    climatology_path: Path = CLIMATOLOGY_PATH,
+    sketches_path: Path = SKETCHES_PATH,
+):
+    marker = Path(root) / MARKER_NAME
+    if marker.exists() and marker.read_text().strip() == SCHEMA_VERSION:
+        print(f"{root} is already at schema v{SCHEMA_VERSION}")
+        return False
+
+    rewritten = migrate_snapshot(arrow_path)
+    print(f"Imported {import_legacy_parquet(legacy_parquet, root=root)} legacy parquet rows")
+    print(f"Imported {migrate_json(json_path, root=root, arrow_path=arrow_path)} JSON rows")
+    print(f"Migrated {migrate_v1_history(root)} v1 history rows")
+    if rewritten:
+        print(f"Rewrote {arrow_path} with the v2 schema")
+
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(SCHEMA_VERSION + "\n")
+
+    # imported rows sit below any existing watermarks; recount them
+    print(f"Counted {update_climatology(climatology_path, root=root, rebuild=True)} rows into {climatology_path}")
+    print(f"Sketched {update_score_sketches(sketches_path, root=root, rebuild=True)} days into {sketches_path}")
+
+    if remove_legacy and Path(legacy_parquet).exists():
+        Path(legacy_parquet).unlink()
+        print(f"Removed {legacy_parquet}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate AQI storage to schema v2.")
+    parser.add_argument(
+        "--remove-legacy",
+        action="store_true",
+        help="delete data/delhi_hourly_aqi.parquet once it is imported",
+    )
+    args = parser.parse_args()
+
+    run(remove_legacy=args.remove_legacy)
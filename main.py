@@ -1,79 +1,117 @@
+import argparse
 import json
-from pathlib import Path
-from datetime import date
+import sys
+from datetime import datetime
 
-from src.penalties import (
-    get_duration_factor,
-    get_activity_factor,
-    get_time_penalty,
-)
-from src.exposure import compute_exposure_score
-from src.windows import generate_time_windows
-from src.ranker import label_windows
+from src import metrics
+from src.aqi_store import AQIStore
+from src.climatology import get_climatology
+from src.engine import DEFAULT_LOCATION, IST, OK_STATUSES, ist_now, recommend, recommendation_json
+from src.rec_cache import RecommendationCache
+from src.sketch import get_score_sketches
 
 
-JSON_PATH = Path("data/delhi_hourly_aqi.json")
+def main(duration: int = 30, activity: str = "walking", clock=ist_now):
+    # current Arrow snapshot
+    store = AQIStore(watch=False)
 
-
-with open(JSON_PATH, "r") as f:
-    hourly_aqi = json.load(f)["data"]
-
-today = date.today().strftime("%Y-%m-%d")
-
-hourly_aqi = [
-    h for h in hourly_aqi
-    if h.get("date") == today
-]
-
-if not hourly_aqi:
-    raise ValueError("No AQI data available for today.")
-
-
-# User input
-duration = 30  # minutes
-activity = "walking"
-
-duration_factor = get_duration_factor(duration)
-activity_factor = get_activity_factor(activity)
-
-windows = generate_time_windows(hourly_aqi, duration)
-
-
-
-for w in windows:
-    hour_penalties = [get_time_penalty(h) for h in w["hours"]]
-    time_penalty = sum(hour_penalties) / len(hour_penalties)
-    w["exposure"] = compute_exposure_score(
-        w["avg_aqi"],
-        duration_factor,
-        activity_factor,
-        time_penalty,
+    # same climatology fallback and long-run labels as the app
+    status, ranked = recommend(
+        duration, activity, source=store, clock=clock,
+        fallback=get_climatology(), sketches=get_score_sketches(),
     )
 
-    # w["NormalizedScore"] = min(100, w["exposure"] / 10)
-
-max_exposure = max(w["exposure"] for w in windows)
-
-for w in windows:
-    w["NormalizedScore"] = round(
-        (w["exposure"] / max_exposure) * 100, 1
+    if status == "no_data":
+        raise ValueError("No AQI data available for today.")
+    if status not in OK_STATUSES:
+        print("No outdoor windows remain today.")
+        return
+    if status == "climatology":
+        print("No forecast for today yet; ranked on typical AQI for past days like today.")
+
+    # Show top results
+    for w in ranked.best(3):
+        print(
+            f"{w['start_hour']}:00–{w['end_hour']}:00 | "
+            f"AQI {round(w['avg_aqi'])} | "
+            f"Score {round(w['NormalizedScore'],1)} | "
+            f"{w['label']}"
+        )
+
+
+def answer_query(
+    query: dict, source, cache=None, window_cache=None, top: int = 3, fallback=None, sketches=None,
+) -> dict:
+    # query: {"location", "duration", "activity", "time"}. time is ISO 8601;
+    # naive times are read as IST and a missing time means "now". fallback
+    # and sketches are passed through to recommend().
+    when = datetime.fromisoformat(query["time"]) if query.get("time") else ist_now()
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=IST)
+    when = when.astimezone(IST)
+
+    status, ranked = recommend(
+        int(query["duration"]),
+        query["activity"],
+        source=source,
+        clock=lambda: when,
+        location=query.get("location", DEFAULT_LOCATION),
+        cache=cache,
+        window_cache=window_cache,
+        fallback=fallback,
+        sketches=sketches,
     )
 
-current_hour = datetime.now().hour 
-
-windows = [
-    w for w in windows
-    if w["start_hour"] >= current_hour
-]
-
-windows = sorted(windows, key=lambda x: x["exposure"])
-windows = label_windows(windows)
-
-# Show top results
-for w in windows[:3]:
-    print(
-        f"{w['start_hour']}:00–{w['end_hour']}:00 | "
-        f"AQI {round(w['avg_aqi'])} | "
-        f"Score {round(w['NormalizedScore'],1)} | "
-        f"{w['label']}"
+    return {**query, **recommendation_json(status, ranked, top)}
+
+
+def run_batch(lines, out, source=None, top: int = 3, fallback=None, sketches=None) -> int:
+    # JSON lines in, JSON lines out, one answer per query as it is read.
+    # The snapshot is loaded once and queries for the same
+    # (location, day, profile) share one scoring pass. Without a source the
+    # default data is used: the snapshot plus, as in the app, its
+    # climatology fallback and score sketches.
+    if source is None:
+        source = AQIStore(watch=False)
+        fallback, sketches = get_climatology(), get_score_sketches()
+    cache = RecommendationCache(maxsize=4096)
+    window_cache = RecommendationCache(maxsize=1024)
+
+    answered = 0
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            result = answer_query(
+                json.loads(line), source, cache, window_cache, top=top, fallback=fallback, sketches=sketches,
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            result = {"line": line_no, "error": f"{type(e).__name__}: {e}"}
+        out.write(json.dumps(result) + "\n")
+        answered += 1
+
+    out.flush()
+    return answered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Best time to go out today.")
+    parser.add_argument("--duration", type=int, default=30, help="minutes outside")
+    parser.add_argument("--activity", default="walking")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="answer JSON-lines queries from FILE ('-' for stdin), one JSON line out per query",
     )
+    parser.add_argument("--top", type=int, default=3, help="best windows per batch answer")
+    args = parser.parse_args()
+
+    with metrics.profiled():
+        if args.batch is None:
+            # User input
+            main(duration=args.duration, activity=args.activity)
+        elif args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, top=args.top)
+        else:
+            with open(args.batch) as f:
+                run_batch(f, sys.stdout, top=args.top)
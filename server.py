@@ -0,0 +1,23 @@
+import argparse
+
+import tornado.ioloop
+
+from src import metrics
+from src.service import DEFAULT_PORT, make_app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON recommendation service.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--address", default="127.0.0.1")
+    args = parser.parse_args()
+
+    # Data stays in memory; the store reloads itself when the fetch job
+    # writes a new snapshot.
+    app = make_app()
+    app.listen(args.port, address=args.address, xheaders=True)
+    print(f"Serving on http://{args.address}:{args.port}/recommend")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        metrics.flush()
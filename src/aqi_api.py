@@ -1,71 +1,194 @@
 import json
 import os
-import pandas as pd
 import requests
 from datetime import datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+from src import locations, metrics
+from src.history_store import commit_staged, discard_staged, stage_hourly_aqi
+from src.snapshot import ARROW_PATH, write_arrow_snapshot
 
 
 DATA_DIR = Path("data")
 JSON_PATH = DATA_DIR / "delhi_hourly_aqi.json"
-PARQUET_PATH = DATA_DIR / "delhi_hourly_aqi.parquet"
 
+API_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
 
-def fetch_and_store_hourly_city_aqi(
-    lat=28.7041,
-    lon=77.1025,
-):
-    # ---------- FETCH ----------
-    url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "us_aqi",
-        "forecast_days": 3,
-        "timezone": "auto"
-    }
+DEFAULT_LOCATION = {"name": locations.DEFAULT_LOCATION, "lat": 28.7041, "lon": 77.1025}
 
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
+# Open-Meteo accepts comma-separated coordinate lists; keep URLs short.
+MAX_COORDS_PER_REQUEST = 50
 
-    data = response.json()["hourly"]
+_session = None
+
+
+def get_session() -> requests.Session:
+    # One pooled Session per process so repeated calls reuse TLS connections.
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def parse_hourly_payload(payload: dict, location: str) -> list:
+    data = payload["hourly"]
     times = data["time"]
     aqi_values = data["us_aqi"]
 
     hourly_aqi = []
     for t, aqi in zip(times, aqi_values):
+        if aqi is None:
+            continue
         dt = datetime.fromisoformat(t)
         hourly_aqi.append({
+            "location": location,
             "date": dt.strftime("%Y-%m-%d"),
             "hour": dt.hour,
             "aqi": int(aqi),
         })
+    return hourly_aqi
+
+
+def chunk_params(chunk: list, start_date: str = None, end_date: str = None) -> dict:
+    params = {
+        "latitude": ",".join(str(loc["lat"]) for loc in chunk),
+        "longitude": ",".join(str(loc["lon"]) for loc in chunk),
+        "hourly": "us_aqi",
+        "timezone": "auto",
+    }
+    if start_date:
+        # historical range instead of the 3-day forecast
+        params["start_date"] = start_date
+        params["end_date"] = end_date or start_date
+    else:
+        params["forecast_days"] = 3
+    return params
 
-    DATA_DIR.mkdir(exist_ok=True)
-
-    # ---------- JSON (overwrite snapshot) ----------
-    with open(JSON_PATH, "w") as f:
-        json.dump(
-            {
-                "fetched_at": datetime.utcnow().isoformat(),
-                "data": hourly_aqi,
-            },
-            f,
-            indent=2,
-        )
 
-    # ---------- PARQUET (append with dedupe) ----------
-    df_new = pd.DataFrame(hourly_aqi)
+def parse_chunk_payloads(chunk: list, payloads) -> dict:
+    # A single coordinate comes back as an object, several as a list
+    if isinstance(payloads, dict):
+        payloads = [payloads]
 
-    if PARQUET_PATH.exists():
-        df_old = pd.read_parquet(PARQUET_PATH)
-        df_final = pd.concat([df_old, df_new], ignore_index=True)
-        df_final = df_final.drop_duplicates(
-            subset=["date", "hour"], keep="last"
+    if len(payloads) != len(chunk):
+        raise ValueError(
+            f"Expected {len(chunk)} locations in response, got {len(payloads)}"
         )
-    else:
-        df_final = df_new
 
-    df_final.to_parquet(PARQUET_PATH, index=False)
+    results = {}
+    for loc, payload in zip(chunk, payloads):
+        results[loc["name"]] = parse_hourly_payload(payload, loc["name"])
+        metrics.incr("aqi_api.rows", len(results[loc["name"]]))
+    return results
 
-    return hourly_aqi
+
+def fetch_hourly_aqi_batch(
+    locations: list,
+    session: requests.Session = None,
+    url: str = API_URL,
+    timeout: float = 10,
+    chunk_size: int = MAX_COORDS_PER_REQUEST,
+) -> dict:
+    # locations: [{"name": ..., "lat": ..., "lon": ...}, ...]
+    # returns {name: [hourly rows]}
+    session = session or get_session()
+    results = {}
+
+    for i in range(0, len(locations), chunk_size):
+        chunk = locations[i : i + chunk_size]
+
+        with metrics.span("aqi_api.http_fetch", locations=len(chunk)):
+            response = session.get(url, params=chunk_params(chunk), timeout=timeout)
+            response.raise_for_status()
+        metrics.incr("aqi_api.requests")
+        metrics.incr("aqi_api.response_bytes", len(response.content))
+
+        with metrics.span("aqi_api.json_decode"):
+            payloads = response.json()
+        results.update(parse_chunk_payloads(chunk, payloads))
+
+    return results
+
+
+def store_hourly_aqi(
+    hourly_aqi: list,
+    json_path: Path = None,
+    history_dir: Path = None,
+    arrow_path: Path = None,
+    export_json: bool = False,
+):
+    # All-or-nothing: history partitions, the Arrow snapshot and the JSON
+    # export are first written as temp files and only swapped in once every
+    # write has succeeded, so a failure never leaves them out of sync.
+    fetched_at = datetime.utcnow().isoformat()
+    arrow_path = Path(arrow_path or ARROW_PATH)
+    json_path = Path(json_path or JSON_PATH)
+
+    def write_json(path):
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "fetched_at": fetched_at,
+                    "data": hourly_aqi,
+                },
+                f,
+                indent=2,
+            )
+
+    staged, tmp_paths = [], []
+    try:
+        # ---------- HISTORY (merge only the fetched partitions) ----------
+        with metrics.span("aqi_api.store_history", rows=len(hourly_aqi)):
+            staged = stage_hourly_aqi(hourly_aqi, root=history_dir)
+
+        # ---------- ARROW (overwrite snapshot, memory-mappable) ----------
+        with metrics.span("aqi_api.store_arrow"):
+            tmp = arrow_path.with_name(arrow_path.name + ".staged")
+            tmp_paths.append((tmp, arrow_path))
+            write_arrow_snapshot(hourly_aqi, fetched_at, path=tmp)
+
+        # ---------- JSON (optional human-readable export) ----------
+        if export_json:
+            json_path.parent.mkdir(parents=True, exist_ok=True)
+            with metrics.span("aqi_api.store_json"):
+                tmp = json_path.with_name(json_path.name + ".tmp")
+                tmp_paths.append((tmp, json_path))
+                write_json(tmp)
+    except Exception:
+        discard_staged(staged)
+        for tmp, _ in tmp_paths:
+            tmp.unlink(missing_ok=True)
+        raise
+
+    commit_staged(staged)
+    for tmp, path in tmp_paths:
+        os.replace(tmp, path)
+
+
+def fetch_and_store_hourly_aqi_batch(
+    locations: list,
+    session: requests.Session = None,
+    url: str = API_URL,
+    export_json: bool = False,
+) -> dict:
+    results = fetch_hourly_aqi_batch(locations, session=session, url=url)
+
+    hourly_aqi = [row for rows in results.values() for row in rows]
+    store_hourly_aqi(hourly_aqi, export_json=export_json)
+
+    return results
+
+
+def fetch_and_store_hourly_city_aqi(
+    lat=DEFAULT_LOCATION["lat"],
+    lon=DEFAULT_LOCATION["lon"],
+    location=DEFAULT_LOCATION["name"],
+):
+    results = fetch_and_store_hourly_aqi_batch(
+        [{"name": location, "lat": lat, "lon": lon}]
+    )
+    return results[location]
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # fall back to mtime checks on read
+    FileSystemEventHandler = object
+    Observer = None
+
+from src.locations import DEFAULT_LOCATION
+from src.snapshot import ARROW_PATH, ArrowSnapshot
+
+
+def _freeze(rows) -> tuple:
+    return tuple(MappingProxyType(dict(row)) for row in rows)
+
+
+class _JsonSnapshot:
+    # Whole JSON export parsed up front and grouped by date / (location, date).
+
+    def __init__(self, raw: bytes, mtime):
+        payload = json.loads(raw)
+        self.version = hashlib.sha1(raw).hexdigest()
+        self.fetched_at = payload.get("fetched_at")
+        self.mtime = mtime
+
+        by_date = {}
+        by_location_date = {}
+        for row in _freeze(payload.get("data", [])):
+            by_date.setdefault(row.get("date"), []).append(row)
+            key = (row.get("location", DEFAULT_LOCATION), row.get("date"))
+            by_location_date.setdefault(key, []).append(row)
+        self._by_date = MappingProxyType({k: tuple(r) for k, r in by_date.items()})
+        self._by_location_date = MappingProxyType({k: tuple(r) for k, r in by_location_date.items()})
+
+    def for_date(self, date: str, location: str = None) -> tuple:
+        if location is None:
+            return self._by_date.get(date, ())
+        return self._by_location_date.get((location, date), ())
+
+    def dates(self) -> list:
+        return sorted(self._by_date)
+
+    def all_rows(self) -> list:
+        return [dict(r) for rows in self._by_date.values() for r in rows]
+
+
+class _ArrowBackedSnapshot:
+    # Memory-mapped Arrow snapshot; a (location, date) slice becomes row
+    # mappings the first time it is read and is reused after that.
+
+    def __init__(self, path: Path, mtime):
+        self._arrow = ArrowSnapshot(path)
+        self.version = self._arrow.version
+        self.fetched_at = self._arrow.fetched_at
+        self.mtime = mtime
+        self._cache = {}
+
+    def _slice(self, location: str, date: str) -> tuple:
+        key = (location, date)
+        rows = self._cache.get(key)
+        if rows is None:
+            rows = self._cache[key] = _freeze(self._arrow.rows(location, date))
+        return rows
+
+    def for_date(self, date: str, location: str = None) -> tuple:
+        if location is not None:
+            return self._slice(location, date)
+        return tuple(
+            row
+            for loc, day in self._arrow.keys()
+            if day == date
+            for row in self._slice(loc, day)
+        )
+
+    def dates(self) -> list:
+        return sorted({day for _, day in self._arrow.keys()})
+
+    def all_rows(self) -> list:
+        return self._arrow.all_rows()
+
+
+class _EmptySnapshot:
+    version = None
+    fetched_at = None
+    mtime = None
+
+    def for_date(self, date: str, location: str = None) -> tuple:
+        return ()
+
+    def dates(self) -> list:
+        return []
+
+    def all_rows(self) -> list:
+        return []
+
+
+EMPTY_SNAPSHOT = _EmptySnapshot()
+
+
+class _ReloadHandler(FileSystemEventHandler):
+    def __init__(self, store):
+        self.store = store
+
+    def _maybe_reload(self, path):
+        if Path(path).resolve() in self.store.watched_paths():
+            self.store.reload()
+
+    def on_modified(self, event):
+        self._maybe_reload(event.src_path)
+
+    def on_created(self, event):
+        self._maybe_reload(event.src_path)
+
+    def on_moved(self, event):
+        # the fetch job writes a temp file and renames it over the snapshot
+        self._maybe_reload(event.dest_path)
+
+
+class AQIStore:
+    # Process-wide, read-mostly view of the AQI snapshot. Readers get an
+    # immutable snapshot reference; reload() builds a new one and swaps it in.
+    # With no explicit path only the Arrow snapshot is served: the JSON export
+    # is optional and can be stale, so it is read only when passed as path.
+
+    def __init__(self, path: Path = None, watch: bool = True):
+        self.paths = [Path(path) if path else ARROW_PATH]
+        self.path = self.paths[0]
+        self._lock = threading.Lock()
+        self._snapshot = EMPTY_SNAPSHOT
+        self._observer = None
+
+        self.reload()
+        if watch:
+            self.start_watching()
+
+    def watched_paths(self) -> set:
+        return {p.resolve() for p in self.paths}
+
+    def _current_path(self):
+        for path in self.paths:
+            if path.exists():
+                return path
+        return None
+
+    def _load(self, path: Path, mtime):
+        if path.suffix == ".arrow":
+            return _ArrowBackedSnapshot(path, mtime)
+        return _JsonSnapshot(path.read_bytes(), mtime)
+
+    def reload(self) -> bool:
+        with self._lock:
+            path = self._current_path()
+            try:
+                mtime = (path, path.stat().st_mtime_ns)
+                snapshot = self._load(path, mtime)
+            except (AttributeError, OSError, ValueError):
+                # missing or half-written file: keep serving the last good snapshot
+                return False
+
+            self.path = path
+            if snapshot.version == self._snapshot.version:
+                self._snapshot.mtime = mtime
+                return False
+
+            self._snapshot = snapshot
+            return True
+
+    def start_watching(self):
+        if Observer is None or self._observer is not None:
+            return
+        observer = Observer()
+        observer.daemon = True
+        for directory in {p.parent for p in self.paths}:
+            directory.mkdir(parents=True, exist_ok=True)
+            observer.schedule(_ReloadHandler(self), str(directory), recursive=False)
+        observer.start()
+        self._observer = observer
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def _check_mtime(self):
+        # Without watchdog, a stat() per read is enough to notice new snapshots.
+        path = self._current_path()
+        try:
+            mtime = (path, path.stat().st_mtime_ns)
+        except (AttributeError, OSError):
+            return
+        if mtime != self._snapshot.mtime:
+            self.reload()
+
+    def snapshot(self):
+        if self._observer is None:
+            self._check_mtime()
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    def for_date(self, date: str, location: str = None) -> tuple:
+        return self.snapshot().for_date(date, location)
+
+    def dates(self) -> list:
+        return self.snapshot().dates()
+
+    def all_rows(self) -> list:
+        return self.snapshot().all_rows()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path: Path = None) -> AQIStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AQIStore(path)
+        return _store
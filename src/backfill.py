@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+from tornado.httpclient import AsyncHTTPClient
+
+from src import metrics
+from src.aqi_api import API_URL, chunk_params
+from src.fetch_scheduler import (
+    DEFAULT_ATTEMPTS,
+    DEFAULT_BURST,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE,
+    DAILY_LIMIT,
+    HOURLY_LIMIT,
+    RateLimiter,
+    fetch_chunk,
+)
+from src.history_store import DATA_DIR, append_hourly_aqi, compact_history
+
+
+CHECKPOINT_PATH = DATA_DIR / "backfill_checkpoint.json"
+
+# Days per request; ~3 months of hourly values is a modest response.
+DEFAULT_CHUNK_DAYS = 92
+
+# Locations per request; fewer than the nightly job since each carries months.
+DEFAULT_LOCATIONS_PER_REQUEST = 10
+
+
+def date_chunks(start: str, end: str, days: int = DEFAULT_CHUNK_DAYS) -> list:
+    # Inclusive [start, end] split into (start_date, end_date) pairs
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    if first > last:
+        raise ValueError(f"start {start} is after end {end}")
+
+    chunks = []
+    while first <= last:
+        chunk_end = min(first + timedelta(days=days - 1), last)
+        chunks.append((first.isoformat(), chunk_end.isoformat()))
+        first = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def unit_key(locations: list, start: str, end: str) -> str:
+    return ",".join(loc["name"] for loc in locations) + f"|{start}|{end}"
+
+
+def load_checkpoint(path: Path = None) -> set:
+    path = Path(path or CHECKPOINT_PATH)
+    if not path.exists():
+        return set()
+    return set(json.loads(path.read_text())["done"])
+
+
+def save_checkpoint(done: set, path: Path = None):
+    path = Path(path or CHECKPOINT_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"done": sorted(done)}, indent=1))
+    os.replace(tmp, path)
+
+
+async def backfill_async(
+    locations: list,
+    start: str,
+    end: str,
+    root: Path = None,
+    checkpoint_path: Path = None,
+    url: str = API_URL,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    locations_per_request: int = DEFAULT_LOCATIONS_PER_REQUEST,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: float = DEFAULT_RATE,
+    burst: int = DEFAULT_BURST,
+    hourly_limit: int = HOURLY_LIMIT,
+    daily_limit: int = DAILY_LIMIT,
+    attempts: int = DEFAULT_ATTEMPTS,
+    timeout: float = 60,
+    backoff: float = 1,
+    max_backoff: float = 30,
+) -> dict:
+    # Work is split into (location group, date range) units. Units run
+    # concurrently; each one's rows are appended as new part files and the
+    # unit is checkpointed, so a killed run resumes with the units left.
+    done = load_checkpoint(checkpoint_path)
+    groups = [
+        locations[i : i + locations_per_request]
+        for i in range(0, len(locations), locations_per_request)
+    ]
+    all_units = [
+        (group, chunk_start, chunk_end)
+        for chunk_start, chunk_end in date_chunks(start, end, chunk_days)
+        for group in groups
+    ]
+    units = [u for u in all_units if unit_key(*u) not in done]
+
+    # rows are written as they arrive; only counts are kept in memory
+    report = {"units": len(units), "skipped": len(all_units) - len(units), "rows": 0, "failed": {}}
+    # a 92-day unit of 10 locations weighs 70 calls (see call_weight)
+    limiter = RateLimiter(rate, burst, hourly_limit, daily_limit)
+    semaphore = asyncio.Semaphore(concurrency)
+    client = AsyncHTTPClient(force_instance=True, max_clients=concurrency)
+
+    async def run(group, chunk_start, chunk_end):
+        key = unit_key(group, chunk_start, chunk_end)
+        async with semaphore:
+            try:
+                results = await fetch_chunk(
+                    client, group, chunk_params(group, chunk_start, chunk_end), url, limiter,
+                    attempts, timeout, backoff, max_backoff,
+                )
+                rows = [row for group_rows in results.values() for row in group_rows]
+                with metrics.span("backfill.write", rows=len(rows)):
+                    await asyncio.to_thread(append_hourly_aqi, rows, root)
+            except Exception as e:
+                metrics.incr("backfill.failed_units")
+                report["failed"][key] = f"{type(e).__name__}: {e}"
+                return
+
+        # a kill between the write and this line only means the unit is
+        # fetched and appended again; compaction drops the duplicates
+        report["rows"] += len(rows)
+        done.add(key)
+        save_checkpoint(done, checkpoint_path)
+        metrics.incr("backfill.units")
+
+    try:
+        with metrics.span("backfill.run", units=len(units)):
+            await asyncio.gather(*(run(*unit) for unit in units))
+    finally:
+        client.close()
+
+    return report
+
+
+def backfill_history(locations: list, start: str, end: str, compact: bool = True, **kwargs) -> dict:
+    report = asyncio.run(backfill_async(locations, start, end, **kwargs))
+    if compact:
+        # fold the appended part files (and any overlap with nightly data) into one per partition
+        compact_history(root=kwargs.get("root"))
+    return report
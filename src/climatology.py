@@ -0,0 +1,210 @@
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src import metrics
+from src.file_cache import load_cached
+from src.history_store import DATA_DIR, list_locations, load_history_after
+from src.locations import DEFAULT_LOCATION
+
+
+CLIMATOLOGY_PATH = DATA_DIR / "climatology.npz"
+
+# AQI histogram bins of 10; the last bin collects everything above MAX_AQI
+BIN_WIDTH = 10
+MAX_AQI = 500
+N_BINS = MAX_AQI // BIN_WIDTH + 1
+SHAPE = (24, 7, 12, N_BINS)  # hour of day x weekday (Mon=0) x month x bin
+
+# A cell with fewer samples borrows from coarser pools: hour x month, then hour
+MIN_SAMPLES = 8
+POOLS = ("hour_weekday_month", "hour_month", "hour")
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def calendar_keys(epoch_hours):
+    # epoch hours -> (hour of day, weekday, month index); 1970-01-01 was a Thursday
+    epoch_hours = np.asarray(epoch_hours, dtype=np.int64)
+    days = epoch_hours // 24
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+    return epoch_hours % 24, (days + 3) % 7, months
+
+
+def _bins(aqi):
+    return np.clip(np.asarray(aqi, dtype=np.int64) // BIN_WIDTH, 0, N_BINS - 1)
+
+
+class _Tables:
+    # Cumulative histograms at the three pooling levels, built once per
+    # update so quantile()/percentile() are a handful of array lookups.
+
+    def __init__(self, counts: np.ndarray):
+        by_month = counts.sum(axis=1)             # (24, 12, bins)
+        by_hour = by_month.sum(axis=1)            # (24, bins)
+        self.levels = [c.cumsum(axis=-1) for c in (counts, by_month, by_hour)]
+        self.counts = [counts, by_month, by_hour]
+
+    def cell(self, hour: int, weekday: int, month: int):
+        # (histogram, cumulative histogram, pool) of the finest pool with enough samples
+        keys = [(hour, weekday, month), (hour, month), (hour,)]
+        for counts, cum, key, pool in zip(self.counts, self.levels, keys, POOLS):
+            if cum[key][-1] >= MIN_SAMPLES:
+                return counts[key], cum[key], pool
+        return self.counts[-1][keys[-1]], self.levels[-1][keys[-1]], POOLS[-1]
+
+
+class ClimatologyIndex:
+    # Per-location AQI histograms by hour of day x weekday x month. Each
+    # location keeps a watermark (last epoch hour counted), so update() only
+    # reads history newer than that; rows added below a watermark (backfill,
+    # legacy imports) need a rebuild(). Also usable as an engine data source:
+    # for_date() returns the typical (median) hourly AQI for that day.
+
+    def __init__(self, counts: dict = None, watermarks: dict = None):
+        self.counts = counts or {}
+        self.watermarks = watermarks or {}
+        self._tables = {}
+        self._version = None
+
+    @property
+    def version(self):
+        # over the counts, not the watermarks: a rebuild changes the counts
+        # without moving them
+        if not self.counts:
+            return None
+        if self._version is None:
+            digest = hashlib.sha1()
+            for location in self.locations():
+                digest.update(location.encode() + b"\0")
+                digest.update(self.counts[location].tobytes())
+            self._version = "clim-" + digest.hexdigest()
+        return self._version
+
+    def locations(self) -> list:
+        return sorted(self.counts)
+
+    def add(self, location: str, epoch_hours, aqi) -> int:
+        epoch_hours = np.asarray(epoch_hours, dtype=np.int64)
+        if not len(epoch_hours):
+            return 0
+        counts = self.counts.setdefault(location, np.zeros(SHAPE, dtype=np.uint32))
+        hours, weekdays, months = calendar_keys(epoch_hours)
+        np.add.at(counts, (hours, weekdays, months, _bins(aqi)), 1)
+
+        self.watermarks[location] = max(self.watermarks.get(location, -1), int(epoch_hours.max()))
+        self._tables.pop(location, None)
+        self._version = None
+        return len(epoch_hours)
+
+    def update(self, root: Path = None, until: datetime = None, locations: list = None) -> int:
+        # Count history rows after each location's watermark and before
+        # `until` (see load_history_after).
+        added = 0
+
+        for location in locations or list_locations(root):
+            with metrics.span("climatology.update", location=location):
+                df = load_history_after(
+                    location, self.watermarks.get(location, -1), until, columns=["aqi"], root=root,
+                )
+                added += self.add(location, df["epoch_hour"].to_numpy(), df["aqi"].to_numpy())
+        metrics.incr("climatology.rows_added", added)
+        return added
+
+    def rebuild(self, root: Path = None, until: datetime = None, locations: list = None) -> int:
+        # Recount the locations' whole history
+        locations = locations or list_locations(root)
+        for location in locations:
+            self.counts.pop(location, None)
+            self.watermarks.pop(location, None)
+            self._tables.pop(location, None)
+        self._version = None
+        return self.update(root=root, until=until, locations=locations)
+
+    def _table(self, location: str):
+        tables = self._tables.get(location)
+        if tables is None and location in self.counts:
+            tables = self._tables[location] = _Tables(self.counts[location])
+        return tables
+
+    def quantile(self, location: str, hour: int, weekday: int, month: int, q: float = 0.5):
+        # month is 1-12 as in datetime; returns the AQI bin midpoint or None
+        typical = self.typical(location, hour, weekday, month, q)
+        return typical and typical[0]
+
+    def typical(self, location: str, hour: int, weekday: int, month: int, q: float = 0.5):
+        # (quantile, pool) where pool (one of POOLS) says which samples it
+        # came from, or None without history
+        tables = self._table(location)
+        if tables is None:
+            return None
+        _, cum, pool = tables.cell(hour, weekday, month - 1)
+        if cum[-1] == 0:
+            return None
+        b = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return b * BIN_WIDTH + BIN_WIDTH / 2, pool
+
+    def percentile(self, location: str, hour: int, weekday: int, month: int, aqi: float):
+        # share of history at this hour/weekday/month below aqi (0-1), or None
+        tables = self._table(location)
+        if tables is None:
+            return None
+        counts, cum, _ = tables.cell(hour, weekday, month - 1)
+        if cum[-1] == 0:
+            return None
+        b = int(_bins([aqi])[0])
+        below = cum[b - 1] if b else 0
+        return float((below + 0.5 * counts[b]) / cum[-1])
+
+    def for_date(self, day: str, location: str = None) -> list:
+        location = location or DEFAULT_LOCATION
+        if location not in self.counts:
+            return []
+        dt = datetime.strptime(day, "%Y-%m-%d")
+        rows = []
+        for hour in range(24):
+            median = self.quantile(location, hour, dt.weekday(), dt.month)
+            if median is not None:
+                rows.append({"location": location, "date": day, "hour": hour, "aqi": median})
+        return rows
+
+    def save(self, path: Path = None):
+        path = Path(path or CLIMATOLOGY_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        names = self.locations()
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                locations=np.array(names, dtype=str),
+                counts=np.stack([self.counts[n] for n in names]) if names else np.zeros((0,) + SHAPE, np.uint32),
+                watermarks=np.array([self.watermarks[n] for n in names], dtype=np.int64),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = None):
+        path = Path(path or CLIMATOLOGY_PATH)
+        with np.load(path) as data:
+            names = data["locations"].tolist()
+            counts = {n: data["counts"][i].copy() for i, n in enumerate(names)}
+            watermarks = {n: int(w) for n, w in zip(names, data["watermarks"])}
+        return cls(counts, watermarks)
+
+
+def update_climatology(path: Path = None, root: Path = None, until: datetime = None, rebuild: bool = False) -> int:
+    # Incremental daily update: load, count rows past the watermarks, save.
+    # rebuild=True recounts everything, after history was added below them.
+    path = Path(path or CLIMATOLOGY_PATH)
+    index = ClimatologyIndex.load(path) if path.exists() else ClimatologyIndex()
+    added = index.rebuild(root=root, until=until) if rebuild else index.update(root=root, until=until)
+    index.save(path)
+    return added
+
+
+def get_climatology(path: Path = None):
+    # None until the first nightly update has written the index
+    return load_cached(path or CLIMATOLOGY_PATH, ClimatologyIndex.load)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src import metrics
+from src.exposure import score_day_windows
+from src.locations import DEFAULT_LOCATION
+from src.precompute import ARTIFACT_PATH, load_recommendations
+from src.ranker import RankedWindows, label_from_percentile
+
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# Statuses that come with ranked windows; "climatology" means today's
+# forecast was missing and typical AQI for the date was ranked instead
+OK_STATUSES = ("ok", "climatology")
+
+# Window fields exposed to JSON clients (batch mode, HTTP service)
+WINDOW_FIELDS = ("start_hour", "end_hour", "avg_aqi", "exposure", "NormalizedScore", "label")
+
+
+def ist_now() -> datetime:
+    return datetime.now(IST)
+
+
+class StaticSource:
+    # In-memory data source for tests, scripts and batch jobs. Anything with
+    # .version and .for_date(day, location=None) works as a source (see AQIStore).
+
+    def __init__(self, hourly_aqi: list):
+        self.rows = list(hourly_aqi)
+        self.version = hashlib.sha1(
+            json.dumps(self.rows, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        self._by_date = {}
+        self._by_location_date = {}
+        for h in self.rows:
+            self._by_date.setdefault(h.get("date"), []).append(h)
+            key = (h.get("location", DEFAULT_LOCATION), h.get("date"))
+            self._by_location_date.setdefault(key, []).append(h)
+
+    def for_date(self, day: str, location: str = None) -> list:
+        if location is None:
+            return self._by_date.get(day, [])
+        return self._by_location_date.get((location, day), [])
+
+
+def _score(source, day, duration, activity, location, window_cache, version):
+    # Scored windows for one (location, day, profile); independent of the
+    # current hour, so callers asking at different hours can share them.
+    # version is the primary source's: fallback windows share the cache,
+    # keyed by their own source's version, without clearing it.
+    hourly_aqi = source.for_date(day, location=location)
+    if not hourly_aqi:
+        return None, False
+
+    def compute():
+        metrics.incr("engine.computed")
+        with metrics.span("engine.score"):
+            return (score_day_windows(hourly_aqi, duration, activity),)
+
+    if window_cache is None:
+        return compute()[0], True
+
+    (ws,) = window_cache.get_or_compute(
+        version, "windows", source.version, location, day, duration, activity,
+        compute=compute,
+    )
+    return ws, True
+
+
+def _long_run_labels(ranked, sketches, location, duration, activity):
+    # Relabel against the long-run distribution of this profile's scores
+    # instead of today's other windows, when there is enough history.
+    sketch = sketches.get(location, duration, activity)
+    if sketch is None:
+        return ranked
+    metrics.incr("engine.long_run_labels")
+    return RankedWindows(ranked.windows, labeler=lambda s: label_from_percentile(sketch.rank(s)))
+
+
+def _compute(source, day, duration, activity, current_hour, location, artifact_path, window_cache, fallback):
+    # Fastest path first: the nightly artifact, if it was built from this exact
+    # snapshot; otherwise one array pass over the day's rows.
+    if artifact_path is not None:
+        result = load_recommendations(
+            day, duration, activity, current_hour,
+            location=location, version=source.version, path=artifact_path,
+        )
+        if result is not None:
+            metrics.incr("engine.artifact_hits")
+            return result
+
+    ws, has_data = _score(source, day, duration, activity, location, window_cache, source.version)
+    ok_status = "ok"
+    if not has_data and fallback is not None:
+        metrics.incr("engine.fallback")
+        ws, has_data = _score(fallback, day, duration, activity, location, window_cache, source.version)
+        ok_status = "climatology"
+    if not has_data:
+        return "no_data", ()
+    if ws is None:
+        return "no_windows", ()
+
+    # Filter future-only windows
+    remaining = ws[ws["start_hour"] >= current_hour]
+    if len(remaining) == 0:
+        return "none_remaining", ()
+
+    return ok_status, RankedWindows(remaining)
+
+
+def recommend(
+    duration: int,
+    activity: str,
+    source,
+    clock=ist_now,
+    location: str = DEFAULT_LOCATION,
+    cache=None,
+    artifact_path=ARTIFACT_PATH,
+    window_cache=None,
+    fallback=None,
+    sketches=None,
+):
+    # Single entry point for every front end: score -> normalize ->
+    # filter-future -> rank -> label. Returns (status, ranked) where status is
+    # "ok", "climatology", "no_data", "no_windows" or "none_remaining" and
+    # ranked is a RankedWindows (empty tuple unless status is in OK_STATUSES).
+    # window_cache (a RecommendationCache) lets queries for the same profile
+    # at different hours share one scoring pass. fallback is a second source
+    # (e.g. a ClimatologyIndex) used when source has nothing for the day.
+    # sketches (a ScoreSketches) switches labels from day-relative to
+    # long-run percentiles of the profile's historical scores.
+    now = clock()
+    day = now.strftime("%Y-%m-%d")
+    current_hour = now.hour
+
+    def compute():
+        status, ranked = _compute(
+            source, day, duration, activity, current_hour, location, artifact_path,
+            window_cache, fallback,
+        )
+        if sketches is not None and status in OK_STATUSES:
+            ranked = _long_run_labels(ranked, sketches, location, duration, activity)
+        return status, ranked
+
+    with metrics.span("engine.recommend"):
+        if cache is None:
+            return compute()
+
+        version = source.version
+        if fallback is not None or sketches is not None:
+            version = (
+                version,
+                fallback.version if fallback is not None else None,
+                sketches.version if sketches is not None else None,
+            )
+        return cache.get_or_compute(
+            version, location, day, duration, activity, current_hour,
+            compute=compute,
+        )
+
+
+def window_json(w) -> dict:
+    return {k: w[k] for k in WINDOW_FIELDS}
+
+
+def recommendation_json(status: str, ranked, top: int = 3) -> dict:
+    result = {"status": status}
+    if status in OK_STATUSES:
+        result["best"] = [window_json(w) for w in ranked.best(top)]
+        result["worst"] = window_json(ranked.worst()[0])
+    return result
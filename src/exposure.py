@@ -1,2 +1,96 @@
+import math
+
+import numpy as np
+
+from src.penalties import get_activity_factor, get_duration_factor, time_penalty_array
+from src.window_set import WindowSet
+from src.windows import generate_time_windows_array, hourly_series, sliding_window_average
+
+
 def compute_exposure_score(avg_aqi: float, duration_factor: float, activity_factor: float, time_penalty: float) -> float:
     return avg_aqi * duration_factor * activity_factor * time_penalty
+
+
+def compute_exposure_batch(avg_aqi, duration_factors, activity_factors, time_penalty) -> np.ndarray:
+    # Broadcasting version of compute_exposure_score: per-profile factors of
+    # shape (P,) against per-window arrays of shape (N,) or (P, N) -> (P, N).
+    duration_factors = np.asarray(duration_factors, dtype=np.float64)[:, None]
+    activity_factors = np.asarray(activity_factors, dtype=np.float64)[:, None]
+    return np.asarray(avg_aqi) * duration_factors * activity_factors * np.asarray(time_penalty)
+
+
+def profile_factors(profiles: list):
+    # profiles: [{"duration": 30, "activity": "walking"}, ...]; a custom
+    # profile may pass "duration_factor" / "activity_factor" directly.
+    duration_factors = [
+        p["duration_factor"] if "duration_factor" in p else get_duration_factor(p["duration"])
+        for p in profiles
+    ]
+    activity_factors = [
+        p["activity_factor"] if "activity_factor" in p else get_activity_factor(p["activity"])
+        for p in profiles
+    ]
+    return np.array(duration_factors), np.array(activity_factors)
+
+
+def score_profiles(hourly_aqi: list, profiles: list) -> dict:
+    # Exposure of every profile x window in one call. The window axis is the
+    # start position in the hour-sorted series; entries are NaN where the
+    # profile's window doesn't fit (gap, invalid AQI, or past the end).
+    keys, aqi, valid = hourly_series(hourly_aqi)
+    n = len(keys)
+    hours_needed = np.array([math.ceil(p["duration"] / 60) for p in profiles], dtype=np.int64)
+
+    penalty_sum = np.concatenate(([0.0], np.cumsum(time_penalty_array(keys))))
+
+    avg_aqi = np.full((len(profiles), n), np.nan)
+    time_penalty = np.full((len(profiles), n), np.nan)
+
+    # profiles sharing a window length share the window computation
+    for k in np.unique(hours_needed).tolist():
+        starts, avg = sliding_window_average(keys, aqi, valid, k)
+        rows = np.flatnonzero(hours_needed == k)
+        avg_aqi[np.ix_(rows, starts)] = avg
+        time_penalty[np.ix_(rows, starts)] = (penalty_sum[starts + k] - penalty_sum[starts]) / k
+
+    duration_factors, activity_factors = profile_factors(profiles)
+
+    return {
+        "start_hour": keys,
+        "hours_needed": hours_needed,
+        "avg_aqi": avg_aqi,
+        "time_penalty": time_penalty,
+        "exposure": compute_exposure_batch(avg_aqi, duration_factors, activity_factors, time_penalty),
+    }
+
+
+def score_day_windows(hourly_aqi, duration: int, activity: str):
+    # The app pipeline's score + normalize steps as one array pass. Returns a
+    # WindowSet with exposure and NormalizedScore filled in, or None when no
+    # window fits.
+    arrays = generate_time_windows_array(list(hourly_aqi), duration)
+    if len(arrays["start_hour"]) == 0:
+        return None
+
+    hour_penalties = time_penalty_array(arrays["hours"])
+    # summed column by column to match the scalar sum() exactly
+    time_penalty = hour_penalties[:, 0].copy()
+    for j in range(1, hour_penalties.shape[1]):
+        time_penalty += hour_penalties[:, j]
+    time_penalty /= hour_penalties.shape[1]
+
+    exposure = (
+        arrays["avg_aqi"]
+        * get_duration_factor(duration)
+        * get_activity_factor(activity)
+        * time_penalty
+    )
+    normalized = [round(x, 1) for x in (exposure / exposure.max() * 100).tolist()]
+
+    return WindowSet.from_arrays(
+        arrays["start_hour"],
+        arrays["end_hour"],
+        arrays["avg_aqi"],
+        exposure=exposure,
+        NormalizedScore=normalized,
+    )
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import math
+import time
+from datetime import date
+from urllib.parse import urlencode
+
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+from src import metrics
+from src.aqi_api import API_URL, MAX_COORDS_PER_REQUEST, chunk_params, parse_chunk_payloads
+
+
+# Open-Meteo's free tier allows 600 calls/minute, 5000/hour and 10000/day,
+# where a request counts once per location and again per started 14 days of
+# data (see call_weight). The limits below are in those weighted calls. The
+# daily bucket starts full in every process, so it caps one run, not a day
+# of runs.
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+HOURLY_LIMIT = 5000
+DAILY_LIMIT = 10000
+WEIGHT_DAYS = 14
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ATTEMPTS = 4
+
+RETRY_STATUS = {429, 500, 502, 503, 504, 599}  # 599: tornado timeout / connection error
+
+
+def call_weight(params: dict) -> int:
+    # Weighted calls one request with these params costs
+    locations = params["latitude"].count(",") + 1
+    if "start_date" in params:
+        start, end = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+        days = (end - start).days + 1
+    else:
+        days = params.get("forecast_days", 1)
+    return locations * math.ceil(days / WEIGHT_DAYS)
+
+
+class TokenBucket:
+    # Async token bucket: `rate` tokens per second, at most `capacity` saved up.
+    # acquire(n) waits until n tokens are available; a request larger than
+    # the capacity waits for a full bucket and leaves it in debt.
+
+    def __init__(self, rate: float, capacity: int = 1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1):
+        need = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < need:
+                await asyncio.sleep((need - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class RateLimiter:
+    # Per-second, hourly and daily token buckets charged together; a falsy
+    # hourly / daily limit leaves that bucket out.
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        hourly: int = HOURLY_LIMIT,
+        daily: int = DAILY_LIMIT,
+        clock=time.monotonic,
+    ):
+        self.buckets = [TokenBucket(rate, burst, clock)]
+        if hourly:
+            self.buckets.append(TokenBucket(hourly / 3600, hourly, clock))
+        if daily:
+            self.buckets.append(TokenBucket(daily / 86400, daily, clock))
+
+    async def acquire(self, tokens: float = 1):
+        for bucket in self.buckets:
+            await bucket.acquire(tokens)
+
+
+class FetchReport:
+    # Outcome of one scheduled fetch: rows for every location that succeeded
+    # and the last error for every location that didn't.
+
+    def __init__(self):
+        self.results = {}
+        self.failed = {}
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed
+
+    def rows(self) -> list:
+        return [row for rows in self.results.values() for row in rows]
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, HTTPClientError):
+        return exc.code in RETRY_STATUS
+    return isinstance(exc, (OSError, asyncio.TimeoutError))
+
+
+async def fetch_chunk(
+    client, chunk, params, url, limiter,
+    attempts=DEFAULT_ATTEMPTS, timeout=10, backoff=0.5, max_backoff=8,
+) -> dict:
+    # One rate-limited, retried request for a chunk of locations -> {name: rows}.
+    # Every attempt is charged its weighted call count.
+    request_url = url + "?" + urlencode(params)
+    weight = call_weight(params)
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(attempts),
+        wait=wait_random_exponential(multiplier=backoff, max=max_backoff),
+        retry=retry_if_exception(_retryable),
+        reraise=True,
+    )
+
+    async for attempt in retrying:
+        with attempt:
+            await limiter.acquire(weight)
+            if attempt.retry_state.attempt_number > 1:
+                metrics.incr("fetch_scheduler.retries")
+            with metrics.span("fetch_scheduler.http_fetch", locations=len(chunk)):
+                response = await client.fetch(request_url, request_timeout=timeout)
+
+    metrics.incr("aqi_api.requests")
+    metrics.incr("aqi_api.response_bytes", len(response.body))
+    return parse_chunk_payloads(chunk, json.loads(response.body))
+
+
+async def fetch_hourly_aqi_async(
+    locations: list,
+    url: str = API_URL,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: float = DEFAULT_RATE,
+    burst: int = DEFAULT_BURST,
+    hourly_limit: int = HOURLY_LIMIT,
+    daily_limit: int = DAILY_LIMIT,
+    attempts: int = DEFAULT_ATTEMPTS,
+    timeout: float = 10,
+    backoff: float = 0.5,
+    max_backoff: float = 8,
+    chunk_size: int = MAX_COORDS_PER_REQUEST,
+) -> FetchReport:
+    # Every chunk is fetched concurrently (at most `concurrency` in flight,
+    # at most `rate` weighted calls/s and the hourly / daily limits), retried
+    # with jittered exponential backoff, and a chunk that still fails only
+    # fails its own locations.
+    report = FetchReport()
+    limiter = RateLimiter(rate, burst, hourly_limit, daily_limit)
+    semaphore = asyncio.Semaphore(concurrency)
+    client = AsyncHTTPClient(force_instance=True, max_clients=concurrency)
+
+    async def run(chunk):
+        async with semaphore:
+            try:
+                report.results.update(
+                    await fetch_chunk(
+                        client, chunk, chunk_params(chunk), url, limiter,
+                        attempts, timeout, backoff, max_backoff,
+                    )
+                )
+            except Exception as e:
+                metrics.incr("fetch_scheduler.failed_locations", len(chunk))
+                for loc in chunk:
+                    report.failed[loc["name"]] = f"{type(e).__name__}: {e}"
+
+    chunks = [locations[i : i + chunk_size] for i in range(0, len(locations), chunk_size)]
+    try:
+        with metrics.span("fetch_scheduler.fetch_all", chunks=len(chunks)):
+            await asyncio.gather(*(run(chunk) for chunk in chunks))
+    finally:
+        client.close()
+
+    return report
+
+
+def fetch_hourly_aqi_concurrent(locations: list, **kwargs) -> FetchReport:
+    return asyncio.run(fetch_hourly_aqi_async(locations, **kwargs))
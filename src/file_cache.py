@@ -0,0 +1,34 @@
+import threading
+import zipfile
+from pathlib import Path
+
+from src import metrics
+
+
+# Errors a half-written or corrupt file raises while being parsed
+LOAD_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile)
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_cached(path: Path, loader):
+    # loader(path), parsed once per file version (mtime) and shared by every
+    # caller in the process. None when the file is missing or unreadable.
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = (path, loader)
+    with _loaded_lock:
+        cached = _loaded.get(key)
+        if cached is None or cached[0] != mtime:
+            try:
+                cached = (mtime, loader(path))
+            except LOAD_ERRORS:
+                metrics.incr("file_cache.load_errors")
+                return None
+            _loaded[key] = cached
+        return cached[1]
@@ -0,0 +1,386 @@
+import os
+import time
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, unquote
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src import metrics
+from src.locations import DEFAULT_LOCATION
+from src.windows import epoch_hour, epoch_hours
+
+
+DATA_DIR = Path("data")
+HISTORY_DIR = DATA_DIR / "history"
+LEGACY_PARQUET_PATH = DATA_DIR / "delhi_hourly_aqi.parquet"
+
+# Schema v2. Hive layout: history/location=<name>/month=<YYYY-MM>/part-*.parquet
+# Each part file holds (epoch_hour, aqi) sorted by epoch_hour, where
+# epoch_hour is hours since 1970-01-01 00:00 local wall clock (see
+# windows.epoch_hours). A month is one row group: at 744 rows the per-group
+# footer/statistics overhead would outweigh finer pruning, and the file's
+# epoch_hour statistics already let a range scan skip it. Both columns are
+# delta-encoded (sorted hours, slowly varying AQI) before zstd.
+SCHEMA_VERSION = "2"
+PARTITION_COLUMNS = ["location", "month"]
+PART_SCHEMA = pa.schema(
+    [("epoch_hour", pa.int32()), ("aqi", pa.uint16())],
+    metadata={"wtgo.schema_version": SCHEMA_VERSION, "wtgo.sort_order": "epoch_hour"},
+)
+HISTORY_PARTITIONING = ds.partitioning(
+    pa.schema([("location", pa.dictionary(pa.int32(), pa.string())), ("month", pa.string())]),
+    flavor="hive",
+    dictionaries="infer",
+)
+ROW_GROUP_HOURS = 24 * 31
+AQI_MAX = np.iinfo(np.uint16).max
+COMPRESSION = "zstd"
+COLUMN_ENCODING = {"epoch_hour": "DELTA_BINARY_PACKED", "aqi": "DELTA_BINARY_PACKED"}
+
+# Local zone of each location's wall-clock epoch hours (the fetch asks for
+# timezone=auto); unlisted locations are taken to be in DEFAULT_TZ
+DEFAULT_TZ = "Asia/Kolkata"
+LOCATION_TZ = {DEFAULT_LOCATION: "Asia/Kolkata"}
+
+# Columns load_history() can return; date and hour are derived from epoch_hour
+HISTORY_COLUMNS = ["location", "date", "hour", "aqi"]
+KEY_COLUMNS = ["location", "epoch_hour"]
+
+
+def location_dir(location: str, root: Path = None) -> Path:
+    root = Path(root or HISTORY_DIR)
+    return root / f"location={quote(str(location), safe='')}"
+
+
+def list_locations(root: Path = None) -> list:
+    root = Path(root or HISTORY_DIR)
+    return sorted(unquote(d.name.split("=", 1)[1]) for d in root.glob("location=*"))
+
+
+def partition_dir(location: str, day: str, root: Path = None) -> Path:
+    # day may be a full date or just the month
+    return location_dir(location, root) / f"month={str(day)[:7]}"
+
+
+def _part_files(part: Path) -> list:
+    # part names start with a nanosecond timestamp, so name order == write order
+    return sorted(part.glob("part-*.parquet"))
+
+
+def _new_part_path(part: Path) -> Path:
+    return part / f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _to_frame(hourly_aqi: list) -> pd.DataFrame:
+    # {location, date, hour, aqi} rows -> location / month / epoch_hour / aqi
+    df = pd.DataFrame(hourly_aqi)
+    if "location" not in df.columns:
+        df["location"] = DEFAULT_LOCATION
+    # negative (sentinel) or out-of-range AQI is invalid, as in hourly_series;
+    # such rows are dropped rather than stored as a plausible value
+    aqi = pd.to_numeric(df["aqi"], errors="coerce")
+    valid = aqi.notna() & (aqi >= 0) & (aqi <= AQI_MAX)
+    metrics.incr("history.invalid_rows", int((~valid).sum()))
+    df = df[valid]
+    return pd.DataFrame({
+        "location": df["location"].astype(str).to_numpy(),
+        "month": df["date"].astype(str).str[:7].to_numpy(),
+        "epoch_hour": epoch_hours(df["date"].astype(str).to_numpy(), df["hour"].to_numpy()),
+        "aqi": df["aqi"].to_numpy(),
+    })
+
+
+def _write_tmp(df: pd.DataFrame, part: Path) -> tuple:
+    # -> (tmp, path): the part file is written under a temp name, and readers
+    # only see it once it is renamed to path
+    part.mkdir(parents=True, exist_ok=True)
+    path = _new_part_path(part)
+    tmp = path.with_name(path.name + ".tmp")
+
+    df = df.sort_values("epoch_hour", kind="stable")
+    table = pa.table(
+        {
+            "epoch_hour": pa.array(df["epoch_hour"].to_numpy(), type=pa.int32()),
+            "aqi": pa.array(np.asarray(df["aqi"], dtype=np.float64).round().astype(np.uint16)),
+        },
+        schema=PART_SCHEMA,
+    )
+    pq.write_table(
+        table, tmp,
+        row_group_size=ROW_GROUP_HOURS,
+        compression=COMPRESSION,
+        use_dictionary=False,
+        column_encoding=COLUMN_ENCODING,
+    )
+    return tmp, path
+
+
+def _write_part(df: pd.DataFrame, part: Path) -> Path:
+    tmp, path = _write_tmp(df, part)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_files(files: list) -> pd.DataFrame:
+    frames = [pq.read_table(f).to_pandas() for f in files]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _merge(frames: list) -> pd.DataFrame:
+    df = pd.concat([f for f in frames if not f.empty], ignore_index=True)
+    df = df.drop_duplicates(subset=["epoch_hour"], keep="last")
+    return df.sort_values("epoch_hour", ignore_index=True)
+
+
+def _stage_partition(part: Path, new_rows: pd.DataFrame = None) -> tuple:
+    # Merged partition written as a temp file; the live files are untouched
+    # until commit_staged(). -> (tmp, path, old_files)
+    old_files = _part_files(part)
+    with metrics.span("history.read"):
+        frames = [_read_files(old_files)]
+    if new_rows is not None:
+        frames.append(new_rows[["epoch_hour", "aqi"]])
+
+    with metrics.span("history.merge"):
+        merged = _merge(frames)
+    with metrics.span("history.write"):
+        tmp, path = _write_tmp(merged, part)
+    return tmp, path, old_files
+
+
+def commit_staged(staged: list):
+    for tmp, path, old_files in staged:
+        os.replace(tmp, path)
+        for f in old_files:
+            f.unlink()
+        metrics.incr("history.partitions_rewritten")
+
+
+def discard_staged(staged: list):
+    for tmp, path, old_files in staged:
+        tmp.unlink(missing_ok=True)
+        if not old_files:
+            # staging created this partition; don't leave it behind empty
+            _remove_empty_dirs(path.parent, path.parent.parent)
+
+
+def _remove_empty_dirs(*dirs):
+    for d in dirs:
+        try:
+            d.rmdir()
+        except OSError:
+            return
+
+
+def _rewrite_partition(part: Path, new_rows: pd.DataFrame = None):
+    commit_staged([_stage_partition(part, new_rows)])
+
+
+def stage_hourly_aqi(hourly_aqi: list, root: Path = None) -> list:
+    # First half of upsert_hourly_aqi: every touched (location, month)
+    # partition is merged into a temp file. Callers swap them in together
+    # with commit_staged() (or drop them with discard_staged()).
+    if not hourly_aqi:
+        return []
+
+    df = _to_frame(hourly_aqi)
+    staged = []
+    try:
+        for (location, month), rows in df.groupby(PARTITION_COLUMNS, sort=False):
+            staged.append(_stage_partition(partition_dir(location, month, root), rows))
+    except Exception:
+        discard_staged(staged)
+        raise
+    return staged
+
+
+def upsert_hourly_aqi(hourly_aqi: list, root: Path = None) -> list:
+    # Only the (location, month) partitions present in hourly_aqi are read and
+    # rewritten, so the cost is independent of how much history exists.
+    staged = stage_hourly_aqi(hourly_aqi, root)
+    commit_staged(staged)
+    return [path.parent for _, path, _ in staged]
+
+
+def append_hourly_aqi(hourly_aqi: list, root: Path = None) -> list:
+    # Write-only fast path for bulk loads: each partition gets a new part file
+    # and duplicates are resolved later by compact_history().
+    if not hourly_aqi:
+        return []
+
+    df = _to_frame(hourly_aqi)
+    written = []
+
+    for (location, month), rows in df.groupby(PARTITION_COLUMNS, sort=False):
+        part = partition_dir(location, month, root)
+        written.append(_write_part(rows, part))
+
+    return written
+
+
+def compact_history(root: Path = None, min_files: int = 2) -> int:
+    # Merge every partition holding min_files or more part files into one.
+    root = Path(root or HISTORY_DIR)
+    compacted = 0
+
+    for part in sorted(root.glob("location=*/month=*")):
+        if len(_part_files(part)) < min_files:
+            continue
+
+        _rewrite_partition(part)
+        compacted += 1
+
+    return compacted
+
+
+def import_legacy_parquet(path: Path = None, root: Path = None, default_location: str = DEFAULT_LOCATION) -> int:
+    # One-off import of the old single-file history into the partitioned layout.
+    path = Path(path or LEGACY_PARQUET_PATH)
+    if not path.exists():
+        return 0
+
+    df = pd.read_parquet(path)
+    if "location" not in df.columns:
+        df["location"] = default_location
+    df["date"] = df["date"].astype(str)
+
+    upsert_hourly_aqi(df.to_dict("records"), root=root)
+    return len(df)
+
+
+def _bound(value, end=False):
+    # date / datetime / "YYYY-MM-DD" -> epoch hour (a date covers the whole day)
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(epoch_hours([value.strftime("%Y-%m-%d")], [value.hour])[0])
+    day = value.isoformat() if isinstance(value, date) else date.fromisoformat(str(value)).isoformat()
+    return int(epoch_hours([day], [23 if end else 0])[0])
+
+
+def local_day_start(location: str, now: datetime = None) -> int:
+    # epoch hour at which the location's current local day began
+    now = now or datetime.now(timezone.utc)
+    local = now.astimezone(ZoneInfo(LOCATION_TZ.get(location, DEFAULT_TZ)))
+    return _bound(local.date())
+
+
+def _month_of(epoch_hour: int) -> str:
+    return str(np.datetime64(epoch_hour // 24, "D"))[:7]
+
+
+def load_history(
+    location: str = None,
+    start=None,
+    end=None,
+    columns: list = None,
+    root: Path = None,
+) -> pd.DataFrame:
+    # Hourly history for [start, end] (dates or datetimes, both inclusive).
+    # Only the matching location=/month= directories are listed and opened,
+    # the epoch_hour range is pushed into the parquet scan (files are sorted by
+    # it, so its statistics skip non-overlapping row groups) and only
+    # `columns` are returned. Besides HISTORY_COLUMNS, "epoch_hour" can be
+    # asked for.
+    root = Path(root or HISTORY_DIR)
+    columns = list(columns or HISTORY_COLUMNS)
+    lo, hi = _bound(start), _bound(end, end=True)
+    lo_month = _month_of(lo) if lo is not None else None
+    hi_month = _month_of(hi) if hi is not None else None
+
+    location_dirs = (
+        [location_dir(location, root)] if location is not None
+        else sorted(root.glob("location=*"))
+    )
+    parts = [
+        part
+        for loc_dir in location_dirs
+        for part in sorted(loc_dir.glob("month=*"))
+        if (lo_month is None or part.name[6:] >= lo_month)
+        and (hi_month is None or part.name[6:] <= hi_month)
+    ]
+    part_files = [_part_files(part) for part in parts]
+    files = [str(f) for fs in part_files for f in fs]
+    if not files:
+        return pd.DataFrame({c: [] for c in columns})
+
+    # An uncompacted partition holds several part files; later ones win
+    needs_dedupe = any(len(fs) > 1 for fs in part_files)
+
+    predicate = None
+    if lo is not None:
+        predicate = ds.field("epoch_hour") >= lo
+    if hi is not None:
+        upper = ds.field("epoch_hour") <= hi
+        predicate = upper if predicate is None else predicate & upper
+
+    wanted = set(columns) | (set(KEY_COLUMNS) if needs_dedupe else set())
+    if wanted & {"date", "hour"}:
+        wanted.add("epoch_hour")
+    read_columns = [c for c in ["location", "epoch_hour", "aqi"] if c in wanted]
+
+    dataset = ds.dataset(
+        files,
+        format="parquet",
+        partitioning=HISTORY_PARTITIONING,
+        partition_base_dir=str(root),
+    )
+    with metrics.span("history.load", files=len(files)):
+        # to_table keeps fragment (= write) order
+        table = dataset.to_table(columns=read_columns, filter=predicate)
+    metrics.incr("history.rows_loaded", table.num_rows)
+
+    df = table.to_pandas()
+    if needs_dedupe:
+        df = df.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        df = df.sort_values(KEY_COLUMNS, ignore_index=True)
+    if "location" in df.columns:
+        df["location"] = df["location"].astype(str)
+    if "date" in wanted:
+        df["date"] = (df["epoch_hour"].to_numpy() // 24).astype("datetime64[D]").astype(object)
+    if "hour" in wanted:
+        df["hour"] = (df["epoch_hour"].to_numpy() % 24).astype(np.uint8)
+    return df[columns]
+
+
+def load_history_after(
+    location: str,
+    watermark: int,
+    until: datetime = None,
+    columns: list = None,
+    root: Path = None,
+) -> pd.DataFrame:
+    # Rows after `watermark` (the last epoch hour an incremental consumer has
+    # seen, -1 for none) and before `until` (local wall clock; default: start
+    # of the location's local today, so forecast hours that may still be
+    # revised are left for a later run). Always includes epoch_hour.
+    columns = list(dict.fromkeys(["epoch_hour"] + list(columns or HISTORY_COLUMNS)))
+    stop = epoch_hour(until) if until is not None else local_day_start(location)
+    start = watermark + 1
+    if start >= stop:
+        return pd.DataFrame({c: [] for c in columns})
+    start_dt = np.datetime64(start, "h").astype(datetime)
+    df = load_history(location, start=start_dt, columns=columns, root=root)
+    return df[df["epoch_hour"] < stop]
+
+
+def read_v1_partitions(root: Path = None):
+    # Schema v1 (location=/date= directories with int64 hour/aqi files),
+    # yielded per partition for migrate_history_v2; newest part file wins.
+    root = Path(root or HISTORY_DIR)
+    for part in sorted(root.glob("location=*/date=*")):
+        df = _read_files(_part_files(part))
+        if df.empty:
+            yield part, []
+            continue
+        df = df.drop_duplicates(subset=["hour"], keep="last")
+        df["location"] = unquote(part.parent.name.split("=", 1)[1])
+        df["date"] = part.name.split("=", 1)[1]
+        yield part, df.to_dict("records")
@@ -0,0 +1,3 @@
+# Location of rows, files and requests that don't name one (the original
+# single-city data is Delhi's)
+DEFAULT_LOCATION = "delhi"
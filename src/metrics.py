@@ -0,0 +1,186 @@
+import atexit
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Lightweight stage timings and counters. Disabled by default: span() then
+# returns a shared no-op context manager and incr() returns immediately.
+#
+#   WTGO_METRICS=metrics.jsonl   -> one JSON line per span + running counters per flush
+#   WTGO_METRICS=metrics.prom    -> Prometheus text snapshot, rewritten per flush
+#   WTGO_PROFILE=run.prof        -> cProfile stats for a profiled() block
+#
+# Long-running processes (server.py, the Streamlit app) flush every
+# FLUSH_EVENTS spans or FLUSH_INTERVAL_S seconds, so buffered events stay
+# bounded; the Prometheus snapshot is rewritten on the same schedule.
+
+_enabled = False
+_path = None
+_format = None
+_lock = threading.Lock()
+_counters = {}
+_spans = {}  # name -> [count, total_s, max_s]
+_events = []
+_last_flush = time.monotonic()
+
+FLUSH_EVENTS = 1000
+FLUSH_INTERVAL_S = 60.0
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        duration = time.perf_counter() - self.start
+        with _lock:
+            stats = _spans.setdefault(self.name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            if _format == "jsonl":
+                event = {"ts": time.time(), "span": self.name, "duration_s": duration}
+                if exc_type is not None:
+                    event["error"] = exc_type.__name__
+                event.update(self.attrs)
+                _events.append(event)
+            due = len(_events) >= FLUSH_EVENTS or time.monotonic() - _last_flush >= FLUSH_INTERVAL_S
+        if due:
+            flush()
+        return False
+
+
+def span(name: str, **attrs):
+    if not _enabled:
+        return NULL_SPAN
+    return _Span(name, attrs)
+
+
+def incr(name: str, value: float = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def enable(path, fmt: str = None):
+    global _enabled, _path, _format
+    _path = Path(path)
+    _format = fmt or ("prometheus" if _path.suffix in (".prom", ".txt") else "jsonl")
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    flush()
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+        _events.clear()
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "spans": {
+                name: {"count": c, "total_s": t, "max_s": m}
+                for name, (c, t, m) in _spans.items()
+            },
+        }
+
+
+def _prom_name(name: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def prometheus_text() -> str:
+    snap = snapshot()
+    lines = [
+        "# TYPE wtgo_span_seconds summary",
+    ]
+    for name, s in sorted(snap["spans"].items()):
+        lines.append(f'wtgo_span_seconds_count{{span="{name}"}} {s["count"]}')
+        lines.append(f'wtgo_span_seconds_sum{{span="{name}"}} {s["total_s"]:.9f}')
+        lines.append(f'wtgo_span_seconds_max{{span="{name}"}} {s["max_s"]:.9f}')
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f"# TYPE wtgo_{_prom_name(name)}_total counter")
+        lines.append(f"wtgo_{_prom_name(name)}_total {value}")
+    return "\n".join(lines) + "\n"
+
+
+def flush():
+    global _last_flush
+    if not _enabled or _path is None:
+        return
+
+    _last_flush = time.monotonic()
+    _path.parent.mkdir(parents=True, exist_ok=True)
+    if _format == "prometheus":
+        _path.write_text(prometheus_text())
+        return
+
+    with _lock:
+        events, _events[:] = list(_events), []
+        counters = dict(_counters)
+    with open(_path, "a") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+        if counters:
+            f.write(json.dumps({"ts": time.time(), "counters": counters}) + "\n")
+
+
+@contextmanager
+def profiled(path=None):
+    # cProfile capture for one run; no-op unless a path (or WTGO_PROFILE) is set
+    path = path or os.environ.get("WTGO_PROFILE")
+    if not path:
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+if os.environ.get("WTGO_METRICS"):
+    enable(os.environ["WTGO_METRICS"])
+
+atexit.register(flush)
@@ -1,3 +1,46 @@
+import numpy as np
+
+
+ACTIVITY_FACTORS = {
+    "errands": 0.8,
+    "standing": 0.8,
+    "standing/errands": 0.8,
+    "walking": 1.0,
+    "brisk walk": 1.3,
+    "running": 1.8,
+    "workout": 1.8,
+}
+
+# Aliases share a factor and so score identically; tables keyed by activity
+# keep one entry per factor, under its first name here ("workout" -> "running")
+_first_name = {}
+CANONICAL_ACTIVITY = {
+    name: _first_name.setdefault(factor, name) for name, factor in ACTIVITY_FACTORS.items()
+}
+
+# Duration bands (minutes): <=15, <=30, <=45, <=60, longer
+DURATION_EDGES = np.array([15, 30, 45, 60])
+DURATION_FACTORS = np.array([0.5, 1.0, 1.5, 2.0, 3.0])
+
+# Time-of-day bands (hours): [5.5, 7.5), [7.5, 10), [10, 17), [17, 21), rest of the day
+TIME_PENALTY_EDGES = np.array([5.5, 7.5, 10.0, 17.0, 21.0])
+TIME_PENALTY_VALUES = np.array([1.3, 0.7, 1.0, 1.2, 1.5, 1.3])
+
+MINUTES_PER_DAY = 24 * 60
+
+# Lookup tables compiled once at import. *_CUMSUM[i] is the total penalty of
+# slots [0, i), so any window's total is a difference of two entries.
+MINUTE_PENALTY = TIME_PENALTY_VALUES[
+    np.searchsorted(TIME_PENALTY_EDGES * 60, np.arange(MINUTES_PER_DAY), side="right")
+]
+MINUTE_PENALTY_CUMSUM = np.concatenate(([0.0], np.cumsum(MINUTE_PENALTY)))
+
+HOUR_PENALTY = TIME_PENALTY_VALUES[
+    np.searchsorted(TIME_PENALTY_EDGES, np.arange(24), side="right")
+]
+HOUR_PENALTY_CUMSUM = np.concatenate(([0.0], np.cumsum(HOUR_PENALTY)))
+
+
 def get_duration_factor(minutes: int) -> float:
     if minutes <= 15:
         return 0.5
@@ -12,15 +55,12 @@ def get_duration_factor(minutes: int) -> float:
 
 
 def get_activity_factor(activity: str) -> float:
-    activity_map = {
-        "errands": 0.8,
-        "standing": 0.8,
-        "walking": 1.0,
-        "brisk walk": 1.3,
-        "running": 1.8,
-        "workout": 1.8,
-    }
-    return activity_map[activity]
+    return ACTIVITY_FACTORS[activity]
+
+
+def canonical_activity(activity: str) -> str:
+    # unknown names pass through and fail wherever they are scored
+    return CANONICAL_ACTIVITY.get(activity, activity)
 
 
 def get_time_penalty(hour: float) -> float:
@@ -34,3 +74,47 @@ def get_time_penalty(hour: float) -> float:
         return 1.5
     else:
         return 1.3
+
+
+def duration_factor_array(minutes) -> np.ndarray:
+    return DURATION_FACTORS[np.searchsorted(DURATION_EDGES, minutes, side="left")]
+
+
+def activity_factor_array(activities) -> np.ndarray:
+    return np.array([ACTIVITY_FACTORS[a] for a in activities], dtype=np.float64)
+
+
+def time_penalty_array(hours) -> np.ndarray:
+    return TIME_PENALTY_VALUES[np.searchsorted(TIME_PENALTY_EDGES, hours, side="right")]
+
+
+def _cumulative(cumsum: np.ndarray, slots: np.ndarray, x):
+    # total penalty of [0, x) on a timeline that repeats every `period` slots;
+    # a fractional x takes the matching fraction of its slot
+    period = len(slots)
+    x = np.asarray(x, dtype=np.float64)
+    whole = np.floor(x)
+    days, slot = np.divmod(whole, period)
+    slot = slot.astype(np.int64)
+    return days * cumsum[-1] + cumsum[slot] + (x - whole) * slots[slot]
+
+
+def window_mean_penalty(start_hours, hours_needed) -> np.ndarray:
+    # Mean hourly penalty of hour-aligned windows [start, start + hours_needed),
+    # wrapping past midnight. O(1) per window.
+    start_hours = np.asarray(start_hours)
+    total = (
+        _cumulative(HOUR_PENALTY_CUMSUM, HOUR_PENALTY, start_hours + hours_needed)
+        - _cumulative(HOUR_PENALTY_CUMSUM, HOUR_PENALTY, start_hours)
+    )
+    return total / hours_needed
+
+
+def minute_penalty_integral(start_minutes, duration_minutes) -> np.ndarray:
+    # Exact integral (penalty x minutes) of the time penalty over
+    # [start, start + duration), with start counted in minutes from midnight.
+    start_minutes = np.asarray(start_minutes, dtype=np.float64)
+    return (
+        _cumulative(MINUTE_PENALTY_CUMSUM, MINUTE_PENALTY, start_minutes + duration_minutes)
+        - _cumulative(MINUTE_PENALTY_CUMSUM, MINUTE_PENALTY, start_minutes)
+    )
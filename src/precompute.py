@@ -0,0 +1,123 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.aqi_store import AQIStore
+from src.exposure import score_day_windows
+from src.file_cache import load_cached
+from src.locations import DEFAULT_LOCATION
+from src.penalties import CANONICAL_ACTIVITY, canonical_activity
+from src.ranker import RankedWindows
+from src.window_set import WindowSet
+
+
+ARTIFACT_PATH = Path("data/recommendations.json")
+
+DURATIONS = [15, 30, 45, 60]
+# One profile per distinct activity factor; aliases are resolved on lookup
+ACTIVITIES = list(dict.fromkeys(CANONICAL_ACTIVITY.values()))
+
+
+def score_day(hourly_aqi, duration: int, activity: str):
+    # Windows of one (day, profile) in exposure order, or None when there are none.
+    ws = score_day_windows(hourly_aqi, duration, activity)
+    if ws is None:
+        return None
+
+    ranked = ws[np.argsort(ws["exposure"], kind="stable")]
+    return {
+        "start_hour": ranked["start_hour"].tolist(),
+        "end_hour": ranked["end_hour"].tolist(),
+        "avg_aqi": ranked["avg_aqi"].tolist(),
+        "exposure": ranked["exposure"].tolist(),
+        "NormalizedScore": ranked["NormalizedScore"].tolist(),
+    }
+
+
+def build_recommendation_artifact(hourly_aqi: list, source_version: str = None) -> dict:
+    by_day = {}
+    for row in hourly_aqi:
+        key = (row.get("location", DEFAULT_LOCATION), row["date"])
+        by_day.setdefault(key, []).append(row)
+
+    locations = {}
+    for (location, day), rows in sorted(by_day.items()):
+        profiles = {}
+        for duration in DURATIONS:
+            for activity in ACTIVITIES:
+                profiles[f"{duration}|{activity}"] = score_day(rows, duration, activity)
+        locations.setdefault(location, {})[day] = profiles
+
+    return {
+        "source_version": source_version,
+        "durations": DURATIONS,
+        "activities": ACTIVITIES,
+        "locations": locations,
+    }
+
+
+def write_recommendation_artifact(store=None, path: Path = None) -> dict:
+    # store: an AQIStore (or anything with .version and .all_rows()); by
+    # default the current Arrow snapshot
+    store = store or AQIStore(watch=False)
+    path = Path(path or ARTIFACT_PATH)
+
+    artifact = build_recommendation_artifact(
+        store.all_rows(),
+        source_version=store.version,
+    )
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+    return artifact
+
+
+def _read_artifact(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+def load_recommendations(
+    day: str,
+    duration: int,
+    activity: str,
+    current_hour: int,
+    location: str = DEFAULT_LOCATION,
+    version: str = None,
+    path: Path = None,
+):
+    # Returns (status, RankedWindows) like the app pipeline, or None when the
+    # artifact is missing, stale or doesn't cover this request.
+    artifact = load_cached(path or ARTIFACT_PATH, _read_artifact)
+    if artifact is None:
+        return None
+    if version is not None and artifact["source_version"] != version:
+        return None
+
+    profiles = artifact["locations"].get(location, {}).get(day)
+    key = f"{duration}|{canonical_activity(activity)}"
+    if profiles is None or key not in profiles:
+        return None
+
+    ranked = profiles[key]
+    if ranked is None:
+        return "no_windows", ()
+
+    # labels depend on which windows remain, so RankedWindows assigns them
+    start = np.asarray(ranked["start_hour"])
+    keep = start >= current_hour
+    if not keep.any():
+        return "none_remaining", ()
+
+    remaining = WindowSet.from_arrays(
+        start[keep],
+        np.asarray(ranked["end_hour"])[keep],
+        np.asarray(ranked["avg_aqi"])[keep],
+        np.asarray(ranked["exposure"])[keep],
+        np.asarray(ranked["NormalizedScore"])[keep],
+    )
+    return "ok", RankedWindows(remaining)
@@ -1,17 +1,175 @@
-def label_windows(windows: list):
-    scores = [w["exposure"] for w in windows]
-    scores_sorted = sorted(scores)
-
-    def percentile(score):
-        return scores_sorted.index(score) / len(scores_sorted)
-
-    for w in windows:
-        p = percentile(w["exposure"])
-        if p <= 0.2:
-            w["label"] = "Best"
-        elif p <= 0.5:
-            w["label"] = "Acceptable"
-        else:
-            w["label"] = "Avoid"
+import heapq
+
+import numpy as np
+
+from src import metrics
+from src.window_set import WindowSet
+
+
+LABELS = np.array(["Best", "Acceptable", "Avoid"])
+
+# Percentile cut-offs: p <= BEST_CUTOFF is "Best", p <= ACCEPTABLE_CUTOFF is
+# "Acceptable", everything above is "Avoid".
+BEST_CUTOFF = 0.2
+ACCEPTABLE_CUTOFF = 0.5
+
+TIE_POLICIES = ("min", "max", "average")
+
+
+def percentile_ranks(scores, ties: str = "min") -> np.ndarray:
+    # Tie policies:
+    #   "min"     -> tied scores share the lowest rank (the original behaviour)
+    #   "max"     -> tied scores share the highest rank
+    #   "average" -> tied scores share the mean of their ranks
+    if ties not in TIE_POLICIES:
+        raise ValueError(f"Unknown tie policy: {ties!r}")
+
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+
+    scores_sorted = np.sort(scores)
+    low = np.searchsorted(scores_sorted, scores, side="left")
+
+    if ties == "min":
+        ranks = low
+    else:
+        high = np.searchsorted(scores_sorted, scores, side="right") - 1
+        ranks = high if ties == "max" else (low + high) / 2
+
+    return ranks / n
+
+
+def label_array(scores, ties: str = "min") -> np.ndarray:
+    p = percentile_ranks(scores, ties=ties)
+    codes = np.where(p <= BEST_CUTOFF, 0, np.where(p <= ACCEPTABLE_CUTOFF, 1, 2))
+    return LABELS[codes]
+
+
+def label_windows(windows: list, ties: str = "min"):
+    with metrics.span("ranker.label_windows", windows=len(windows)):
+        labels = label_array([w["exposure"] for w in windows], ties=ties)
+
+    for w, label in zip(windows, labels.tolist()):
+        w["label"] = label
 
     return windows
+
+
+def label_from_percentile(p: float) -> str:
+    if p <= BEST_CUTOFF:
+        return "Best"
+    if p <= ACCEPTABLE_CUTOFF:
+        return "Acceptable"
+    return "Avoid"
+
+
+def _cutoff_rank(n: int, cutoff: float) -> int:
+    # largest rank r with r / n <= cutoff (same float comparison as label_array)
+    r = min(int(cutoff * n), n - 1)
+    while r + 1 < n and (r + 1) / n <= cutoff:
+        r += 1
+    while r > 0 and r / n > cutoff:
+        r -= 1
+    return r
+
+
+def label_thresholds(scores) -> tuple:
+    # (best_max, acceptable_max) such that, under the "min" tie policy,
+    # score <= best_max is "Best", score <= acceptable_max is "Acceptable"
+    # and anything higher is "Avoid". O(n) via partial partitioning.
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    if n == 0:
+        return None, None
+
+    kth = [_cutoff_rank(n, BEST_CUTOFF), _cutoff_rank(n, ACCEPTABLE_CUTOFF)]
+    part = np.partition(scores, kth)
+    return part[kth[0]], part[kth[1]]
+
+
+def label_from_thresholds(score: float, thresholds: tuple) -> str:
+    best_max, acceptable_max = thresholds
+    if score <= best_max:
+        return "Best"
+    elif score <= acceptable_max:
+        return "Acceptable"
+    return "Avoid"
+
+
+def select_best(scores, k: int) -> np.ndarray:
+    # indices of the k lowest scores, lowest first (ties keep input order)
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    idx = np.argpartition(scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    # argpartition doesn't settle ties at the boundary; pull in every tie
+    idx = np.union1d(idx, np.flatnonzero(scores == scores[idx].max()))
+    return idx[np.lexsort((idx, scores[idx]))][:k]
+
+
+def select_worst(scores, k: int) -> np.ndarray:
+    # indices of the k highest scores, highest first; among ties the later
+    # window comes first, matching sorted(...)[-1]
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    reversed_idx = select_best(-scores[::-1], k)
+    return n - 1 - reversed_idx
+
+
+def iter_ranked(scores):
+    # Lazily yields indices in ascending score order: O(n) to start, then
+    # O(log n) per item, so stopping early never pays for a full sort.
+    heap = [(s, i) for i, s in enumerate(np.asarray(scores, dtype=np.float64).tolist())]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
+
+
+class RankedWindows:
+    # Windows ranked by exposure without sorting or labelling all of them up
+    # front. best()/worst() use partial selection; iterating yields labelled
+    # windows lazily in rank order. Labels are relative to these windows
+    # unless a labeler (score -> label) is given. Given a WindowSet, scores
+    # are read from its column and only returned windows are materialised.
+
+    def __init__(self, windows, key: str = "exposure", labeler=None):
+        if isinstance(windows, WindowSet):
+            self.windows = windows
+            self.scores = np.asarray(windows[key], dtype=np.float64)
+        else:
+            self.windows = list(windows)
+            self.scores = np.array([w[key] for w in self.windows], dtype=np.float64)
+        self.labeler = labeler
+        self._thresholds = None
+
+    def __len__(self):
+        return len(self.windows)
+
+    @property
+    def thresholds(self) -> tuple:
+        if self._thresholds is None:
+            with metrics.span("ranker.thresholds"):
+                self._thresholds = label_thresholds(self.scores)
+        return self._thresholds
+
+    def _labelled(self, i: int):
+        w = self.windows[i]
+        if self.labeler is not None:
+            w["label"] = self.labeler(self.scores[i])
+        else:
+            w["label"] = label_from_thresholds(self.scores[i], self.thresholds)
+        return w
+
+    def best(self, k: int = 1) -> list:
+        return [self._labelled(i) for i in select_best(self.scores, k).tolist()]
+
+    def worst(self, k: int = 1) -> list:
+        return [self._labelled(i) for i in select_worst(self.scores, k).tolist()]
+
+    def __iter__(self):
+        for i in iter_ranked(self.scores):
+            yield self._labelled(i)
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    # Bounded LRU of computed recommendations, shared by every session in the
+    # process. Keys start with the data snapshot version; seeing a new version
+    # drops everything computed from the old snapshot.
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, *key):
+        with self._lock:
+            self._check_version(version)
+            full_key = (version,) + key
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return self._entries[full_key]
+            self.misses += 1
+            return None
+
+    def put(self, version, *key, value):
+        with self._lock:
+            self._check_version(version)
+            self._entries[(version,) + key] = value
+            self._entries.move_to_end((version,) + key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, version, *key, compute):
+        value = self.get(version, *key)
+        if value is None:
+            # computed outside the lock so one slow miss doesn't block every reader
+            value = compute()
+            self.put(version, *key, value=value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_recommendation_cache(maxsize: int = 512) -> RecommendationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RecommendationCache(maxsize)
+        return _cache
@@ -0,0 +1,151 @@
+import hashlib
+import json
+from datetime import datetime
+
+import tornado.web
+
+from src import metrics
+from src.aqi_store import get_store
+from src.climatology import get_climatology
+from src.engine import DEFAULT_LOCATION, IST, ist_now, recommend, recommendation_json
+from src.penalties import ACTIVITY_FACTORS
+from src.rec_cache import RecommendationCache
+from src.sketch import get_score_sketches
+
+
+DEFAULT_PORT = 8050
+
+MAX_TOP = 24
+
+
+class _Response:
+    # Pre-serialized answer: body bytes plus a strong ETag over them, so a
+    # cache hit is a dict lookup and a header compare.
+    __slots__ = ("body", "etag")
+
+    def __init__(self, payload: dict):
+        self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+def _parse_time(value):
+    if not value:
+        return ist_now()
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=IST)
+    return when.astimezone(IST)
+
+
+class RecommendHandler(tornado.web.RequestHandler):
+    # GET /recommend?duration=30&activity=walking[&location=delhi][&time=ISO][&top=3]
+
+    def initialize(self, source, responses, window_cache, load_fallback, load_sketches):
+        self.source = source
+        self.responses = responses
+        self.window_cache = window_cache
+        self.load_fallback = load_fallback
+        self.load_sketches = load_sketches
+
+    def _error(self, status: int, message: str):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"error": message}))
+
+    def get(self):
+        try:
+            duration = int(self.get_query_argument("duration", "30"))
+            activity = self.get_query_argument("activity", "walking")
+            location = self.get_query_argument("location", DEFAULT_LOCATION)
+            top = min(int(self.get_query_argument("top", "3")), MAX_TOP)
+            requested = self.get_query_argument("time", None)
+            now = _parse_time(requested)
+        except ValueError as e:
+            return self._error(400, str(e))
+        if duration <= 0 or top <= 0:
+            return self._error(400, "duration and top must be positive")
+        if activity not in ACTIVITY_FACTORS:
+            return self._error(400, f"unknown activity: {activity}")
+
+        day = now.strftime("%Y-%m-%d")
+        version = self.source.version
+        # picked up per request, so nightly rewrites of either file apply
+        fallback, sketches = self.load_fallback(), self.load_sketches()
+        derived = tuple(d.version if d is not None else None for d in (fallback, sketches))
+
+        def compute():
+            metrics.incr("service.computed")
+            status, ranked = recommend(
+                duration, activity,
+                source=self.source,
+                clock=lambda: now,
+                location=location,
+                window_cache=self.window_cache,
+                fallback=fallback,
+                sketches=sketches,
+            )
+            payload = {
+                "location": location, "date": day, "hour": now.hour,
+                "duration": duration, "activity": activity,
+                "version": version,
+                **recommendation_json(status, ranked, top),
+            }
+            return _Response(payload)
+
+        # Answers only change with the data, the profile and the hour
+        response = self.responses.get_or_compute(
+            (version, derived), location, day, now.hour, duration, activity, top,
+            compute=compute,
+        )
+
+        self.set_header("ETag", response.etag)
+        if requested is None:
+            # "now" answers are good until the hour rolls over
+            self.set_header("Cache-Control", f"max-age={(59 - now.minute) * 60 + 60 - now.second}")
+        if response.etag in self.request.headers.get("If-None-Match", ""):
+            metrics.incr("service.not_modified")
+            self.set_status(304)
+            return self.finish()
+
+        self.set_header("Content-Type", "application/json")
+        self.finish(response.body)
+
+    def compute_etag(self):
+        # ETags are set explicitly from the cached response
+        return None
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def initialize(self, source):
+        self.source = source
+
+    def get(self):
+        self.finish({"status": "ok", "version": self.source.version})
+
+
+def _none():
+    return None
+
+
+def make_app(
+    source=None, cache_size: int = 8192, load_fallback=None, load_sketches=None,
+) -> tornado.web.Application:
+    # load_fallback / load_sketches return the current climatology fallback
+    # and score sketches (or None). Without a source the default data is
+    # served: the store plus, as in the app, its climatology and sketches.
+    if source is None:
+        source = get_store()
+        load_fallback = load_fallback or get_climatology
+        load_sketches = load_sketches or get_score_sketches
+    responses = RecommendationCache(maxsize=cache_size)
+    window_cache = RecommendationCache(maxsize=1024)
+    return tornado.web.Application([
+        (r"/recommend", RecommendHandler, {
+            "source": source,
+            "responses": responses,
+            "window_cache": window_cache,
+            "load_fallback": load_fallback or _none,
+            "load_sketches": load_sketches or _none,
+        }),
+        (r"/health", HealthHandler, {"source": source}),
+    ])
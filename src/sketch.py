@@ -0,0 +1,247 @@
+import hashlib
+import json
+import math
+import os
+import random
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src import metrics
+from src.exposure import score_day_windows
+from src.file_cache import load_cached
+from src.history_store import HISTORY_DIR, list_locations, load_history_after
+from src.penalties import canonical_activity
+from src.precompute import ACTIVITIES, DURATIONS
+
+
+# Stored next to the partitions; the leading "_" keeps dataset scans off it
+SKETCHES_PATH = HISTORY_DIR / "_score_sketches.json"
+
+DEFAULT_K = 128
+
+# Long-run labels need some history behind them (~ a month of windows)
+MIN_COUNT = 500
+
+
+class KLLSketch:
+    # KLL quantile sketch (Karnin, Lang, Liberty 2016). Level h holds items of
+    # weight 2**h; a full level is sorted and every other item (random
+    # offset) is promoted. Memory stays O(k) however many values are added,
+    # rank error is O(1/k), and two sketches merge by concatenating levels.
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+        self._cdf = None
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _grow(self):
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        # compact the lowest full level until everything fits again
+        while self._size >= self._max_size:
+            for h, items in enumerate(self.levels):
+                if len(items) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self._grow()
+                items.sort()
+                keep = [items.pop()] if len(items) % 2 else []
+                promoted = items[self._rng.randint(0, 1)::2]
+                self.levels[h + 1].extend(promoted)
+                self.levels[h] = keep
+                self._size -= len(items) - len(promoted)
+                break
+
+    def update(self, value: float):
+        self.extend([value])
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64).tolist()
+        i = 0
+        while i < len(values):
+            batch = values[i : i + max(1, self._max_size - self._size)]
+            self.levels[0].extend(batch)
+            self.n += len(batch)
+            self._size += len(batch)
+            i += len(batch)
+            self._compress()
+        self._cdf = None
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self._size += sum(len(items) for items in other.levels)
+        self._cdf = None
+        self._compress()
+        return self
+
+    def _weighted(self):
+        # sorted items and cumulative weights, rebuilt only after new values
+        if self._cdf is None:
+            items = np.array([x for items in self.levels for x in items], dtype=np.float64)
+            weights = np.array(
+                [2 ** h for h, items in enumerate(self.levels) for _ in items], dtype=np.float64
+            )
+            order = np.argsort(items, kind="stable")
+            self._cdf = (items[order], np.cumsum(weights[order]))
+        return self._cdf
+
+    def rank(self, value: float) -> float:
+        # estimated share of values strictly below `value`
+        if not self.n:
+            return float("nan")
+        items, cum = self._weighted()
+        i = int(np.searchsorted(items, value, side="left"))
+        return float(cum[i - 1] / cum[-1]) if i else 0.0
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return float("nan")
+        items, cum = self._weighted()
+        i = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(items[min(i, len(items) - 1)])
+
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "levels": [[round(x, 3) for x in sorted(items)] for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.n = data["n"]
+        for h, items in enumerate(data["levels"]):
+            if h:
+                sketch._grow()
+            sketch.levels[h] = list(items)
+            sketch._size += len(items)
+        return sketch
+
+
+def _profile_key(location: str, duration: int, activity: str) -> str:
+    return f"{location}|{duration}|{activity}"
+
+
+class ScoreSketches:
+    # One KLLSketch of window exposure scores per (location, duration,
+    # activity), plus a per-location watermark (last epoch hour folded in) so
+    # update() only scores days of history it has not seen; days added below
+    # a watermark (backfill, legacy imports) need a rebuild(). Aliases share
+    # their canonical activity's sketch.
+
+    def __init__(self, sketches: dict = None, watermarks: dict = None, k: int = DEFAULT_K):
+        self.sketches = sketches or {}
+        self.watermarks = watermarks or {}
+        self.k = k
+        self._version = None
+
+    @property
+    def version(self):
+        # over the sketches, not the watermarks: a rebuild changes them
+        # without moving the watermarks
+        if not self.watermarks:
+            return None
+        if self._version is None:
+            content = json.dumps(self._sketch_dicts(), separators=(",", ":"))
+            self._version = "sketch-" + hashlib.sha1(content.encode()).hexdigest()
+        return self._version
+
+    def _sketch_dicts(self) -> dict:
+        return {key: s.to_dict() for key, s in sorted(self.sketches.items())}
+
+    def get(self, location: str, duration: int, activity: str, min_count: int = MIN_COUNT):
+        sketch = self.sketches.get(_profile_key(location, duration, canonical_activity(activity)))
+        if sketch is None or sketch.n < min_count:
+            return None
+        return sketch
+
+    def add_day(self, location: str, hourly_aqi: list):
+        for duration in DURATIONS:
+            for activity in ACTIVITIES:
+                ws = score_day_windows(hourly_aqi, duration, activity)
+                if ws is None:
+                    continue
+                key = _profile_key(location, duration, activity)
+                sketch = self.sketches.setdefault(key, KLLSketch(self.k))
+                sketch.extend(ws["exposure"])
+        self._version = None
+
+    def update(self, root: Path = None, until: datetime = None, locations: list = None) -> int:
+        # Fold in whole days of history after each watermark and before
+        # `until` (see load_history_after). Returns the number of days added.
+        added = 0
+
+        for location in locations or list_locations(root):
+            with metrics.span("sketch.update", location=location):
+                df = load_history_after(
+                    location, self.watermarks.get(location, -1), until, columns=["date", "hour", "aqi"], root=root,
+                )
+                for day, rows in df.groupby("date", sort=True):
+                    day = day.isoformat()
+                    self.add_day(location, [
+                        {"date": day, "hour": int(h), "aqi": int(a)}
+                        for h, a in zip(rows["hour"], rows["aqi"])
+                    ])
+                    added += 1
+            if len(df):
+                self.watermarks[location] = int(df["epoch_hour"].max())
+        metrics.incr("sketch.days_added", added)
+        return added
+
+    def rebuild(self, root: Path = None, until: datetime = None, locations: list = None) -> int:
+        # Re-sketch the locations' whole history
+        locations = locations or list_locations(root)
+        for key in [k for k in self.sketches if k.split("|", 1)[0] in locations]:
+            del self.sketches[key]
+        for location in locations:
+            self.watermarks.pop(location, None)
+        self._version = None
+        return self.update(root=root, until=until, locations=locations)
+
+    def save(self, path: Path = None):
+        path = Path(path or SKETCHES_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "k": self.k,
+            "watermarks": self.watermarks,
+            "sketches": self._sketch_dicts(),
+        }, separators=(",", ":")))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = None) -> "ScoreSketches":
+        data = json.loads(Path(path or SKETCHES_PATH).read_text())
+        sketches = {key: KLLSketch.from_dict(s) for key, s in data["sketches"].items()}
+        return cls(sketches, data["watermarks"], data.get("k", DEFAULT_K))
+
+
+def update_score_sketches(path: Path = None, root: Path = None, until: datetime = None, rebuild: bool = False) -> int:
+    # rebuild=True re-sketches everything, after history was added below the watermarks
+    path = Path(path or SKETCHES_PATH)
+    sketches = ScoreSketches.load(path) if path.exists() else ScoreSketches()
+    added = sketches.rebuild(root=root, until=until) if rebuild else sketches.update(root=root, until=until)
+    sketches.save(path)
+    return added
+
+
+def get_score_sketches(path: Path = None):
+    # None until the first nightly update has written the sketches
+    return load_cached(path or SKETCHES_PATH, ScoreSketches.load)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+from src.locations import DEFAULT_LOCATION
+
+
+ARROW_PATH = Path("data/delhi_hourly_aqi.arrow")
+
+# Columnar snapshot: location/date are dictionary-encoded so each string is
+# stored once, hour/aqi are narrow ints. Written uncompressed so readers can
+# memory-map it and read without copying.
+SCHEMA_VERSION = "2"
+SNAPSHOT_SCHEMA = pa.schema([
+    ("location", pa.dictionary(pa.int32(), pa.string())),
+    ("date", pa.dictionary(pa.int32(), pa.string())),
+    ("hour", pa.uint8()),
+    ("aqi", pa.uint16()),
+])
+
+
+def snapshot_version(hourly_aqi: list) -> str:
+    return hashlib.sha1(json.dumps(hourly_aqi, sort_keys=True).encode()).hexdigest()
+
+
+def write_arrow_snapshot(hourly_aqi: list, fetched_at: str, path: Path = None) -> str:
+    path = Path(path or ARROW_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = sorted(
+        hourly_aqi,
+        key=lambda h: (h.get("location", DEFAULT_LOCATION), h["date"], h["hour"]),
+    )
+    version = snapshot_version(rows)
+
+    table = pa.table(
+        {
+            "location": pa.array([h.get("location", DEFAULT_LOCATION) for h in rows]).dictionary_encode(),
+            "date": pa.array([h["date"] for h in rows], type=pa.string()).dictionary_encode(),
+            "hour": pa.array([h["hour"] for h in rows], type=pa.uint8()),
+            "aqi": pa.array([h.get("aqi") for h in rows], type=pa.uint16()),
+        },
+        schema=SNAPSHOT_SCHEMA,
+    ).replace_schema_metadata({
+        "version": version,
+        "fetched_at": fetched_at or "",
+        "wtgo.schema_version": SCHEMA_VERSION,
+    })
+
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+    return version
+
+
+class ArrowSnapshot:
+    # Memory-mapped view of a snapshot file. Rows are sorted by
+    # (location, date, hour), so every (location, date) is one contiguous
+    # slice; slices are turned into row dicts only when first asked for.
+
+    def __init__(self, path: Path):
+        self.table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        metadata = self.table.schema.metadata or {}
+        self.version = metadata.get(b"version", b"").decode() or None
+        self.fetched_at = metadata.get(b"fetched_at", b"").decode() or None
+
+        self._slices = {}
+        if self.table.num_rows:
+            loc = self.table.column("location").combine_chunks()
+            day = self.table.column("date").combine_chunks()
+            loc_codes = loc.indices.to_numpy()
+            day_codes = day.indices.to_numpy()
+
+            change = np.flatnonzero(
+                (loc_codes[1:] != loc_codes[:-1]) | (day_codes[1:] != day_codes[:-1])
+            ) + 1
+            starts = np.concatenate(([0], change))
+            ends = np.concatenate((change, [self.table.num_rows]))
+
+            loc_names = loc.dictionary.to_pylist()
+            day_names = day.dictionary.to_pylist()
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                key = (loc_names[loc_codes[s]], day_names[day_codes[s]])
+                self._slices[key] = (s, e - s)
+
+    def keys(self) -> list:
+        return list(self._slices)
+
+    def rows(self, location: str, date: str) -> list:
+        if (location, date) not in self._slices:
+            return []
+        offset, length = self._slices[(location, date)]
+        return self.table.slice(offset, length).to_pylist()
+
+    def all_rows(self) -> list:
+        return self.table.to_pylist()
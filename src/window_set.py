@@ -0,0 +1,153 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+FIELDS = ("start_hour", "end_hour", "avg_aqi", "exposure", "NormalizedScore", "label")
+
+# label is stored as a small code; 0 means "not labelled yet"
+LABEL_NAMES = ("", "Best", "Acceptable", "Avoid")
+LABEL_CODES = {name: code for code, name in enumerate(LABEL_NAMES)}
+
+WINDOW_DTYPE = np.dtype([
+    ("start_hour", np.int16),
+    ("end_hour", np.int16),
+    ("avg_aqi", np.float64),
+    ("exposure", np.float64),
+    ("NormalizedScore", np.float64),
+    ("label", np.int8),
+])
+
+
+class Window:
+    # Slotted stand-in for the old per-window dict. Supports the same keys
+    # (w["avg_aqi"], w["hours"], w["label"] = ...) so existing code keeps
+    # working; unset optional fields raise KeyError just like a dict would.
+    __slots__ = FIELDS
+
+    def __init__(self, start_hour, end_hour, avg_aqi, exposure=None, NormalizedScore=None, label=None):
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.avg_aqi = avg_aqi
+        self.exposure = exposure
+        self.NormalizedScore = NormalizedScore
+        self.label = label
+
+    @property
+    def hours(self) -> list:
+        return list(range(self.start_hour, self.end_hour))
+
+    def keys(self) -> list:
+        keys = ["start_hour", "end_hour", "avg_aqi", "hours"]
+        return keys + [f for f in FIELDS[3:] if getattr(self, f) is not None]
+
+    def __getitem__(self, key):
+        if key == "hours":
+            return self.hours
+        if key not in FIELDS or getattr(self, key) is None:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> dict:
+        return {k: self[k] for k in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, (Window, Mapping)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Window({self.to_dict()!r})"
+
+
+class WindowSet:
+    # Struct-of-windows backed by one NumPy structured array. Field access
+    # (ws["avg_aqi"]) and slicing return views of the same memory; only
+    # integer indexing / iteration materialise Window objects.
+
+    def __init__(self, data: np.ndarray):
+        if data.dtype != WINDOW_DTYPE:
+            raise TypeError(f"expected dtype {WINDOW_DTYPE}, got {data.dtype}")
+        self.data = data
+
+    @classmethod
+    def empty(cls, n: int) -> "WindowSet":
+        data = np.zeros(n, dtype=WINDOW_DTYPE)
+        data["exposure"] = np.nan
+        data["NormalizedScore"] = np.nan
+        return cls(data)
+
+    @classmethod
+    def from_arrays(cls, start_hour, end_hour, avg_aqi, exposure=None, NormalizedScore=None) -> "WindowSet":
+        ws = cls.empty(len(start_hour))
+        ws.data["start_hour"] = start_hour
+        ws.data["end_hour"] = end_hour
+        ws.data["avg_aqi"] = avg_aqi
+        if exposure is not None:
+            ws.data["exposure"] = exposure
+        if NormalizedScore is not None:
+            ws.data["NormalizedScore"] = NormalizedScore
+        return ws
+
+    @classmethod
+    def from_windows(cls, windows) -> "WindowSet":
+        windows = list(windows)
+        ws = cls.empty(len(windows))
+        for field in FIELDS[:5]:
+            ws.data[field] = [w.get(field, np.nan) for w in windows]
+        ws.data["label"] = [LABEL_CODES[w.get("label") or ""] for w in windows]
+        return ws
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return self._window(self.data[key])
+        return WindowSet(self.data[key])
+
+    def __setitem__(self, key, value):
+        if key == "label":
+            value = [LABEL_CODES[v] for v in np.asarray(value).tolist()]
+        self.data[key] = value
+
+    def _window(self, row) -> Window:
+        start, end, avg, exposure, score, label = row.tolist()
+        return Window(
+            start,
+            end,
+            avg,
+            None if exposure != exposure else exposure,
+            None if score != score else score,
+            LABEL_NAMES[label] or None,
+        )
+
+    def __iter__(self):
+        for row in self.data:
+            yield self._window(row)
+
+    @property
+    def labels(self) -> np.ndarray:
+        return np.array(LABEL_NAMES, dtype=object)[self.data["label"]]
+
+    def to_windows(self) -> list:
+        return list(self)
+
+    def to_dicts(self) -> list:
+        return [w.to_dict() for w in self]
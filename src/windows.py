@@ -1,38 +1,218 @@
 import math
 
-def generate_time_windows(hourly_aqi: list, duration_minutes: int):
-    hours_needed = math.ceil(duration_minutes / 60)
-    windows = []
+import numpy as np
+
+from src import metrics
+from src.penalties import minute_penalty_integral, window_mean_penalty
+from src.window_set import WindowSet
+
+
+def sliding_window_average(keys: np.ndarray, aqi: np.ndarray, valid: np.ndarray, hours_needed: int):
+    # keys must already be sorted; returns start positions and averages
+    # of every window whose keys step by exactly 1 and whose AQI is valid.
+    n = len(keys)
+    if hours_needed < 1 or n < hours_needed:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    starts = np.arange(n - hours_needed + 1)
+
+    # ✅ Guard 1: consecutive keys (prefix count of +1 steps)
+    step_ok = np.concatenate(([0], np.cumsum(np.diff(keys) == 1)))
+    consecutive = (step_ok[starts + hours_needed - 1] - step_ok[starts]) == hours_needed - 1
+
+    # ✅ Guard 2: valid AQI values (prefix count of bad hours)
+    bad = np.concatenate(([0], np.cumsum(~valid)))
+    clean = (bad[starts + hours_needed] - bad[starts]) == 0
+
+    aqi_sum = np.concatenate(([0.0], np.cumsum(np.where(valid, aqi, 0.0))))
+    avg_aqi = (aqi_sum[starts + hours_needed] - aqi_sum[starts]) / hours_needed
+
+    keep = consecutive & clean
+    return starts[keep], avg_aqi[keep]
 
+
+def hourly_series(hourly_aqi: list):
+    # sorted hour keys plus AQI values and a validity mask, as arrays
     hourly_aqi = sorted(hourly_aqi, key=lambda x: x["hour"])
+    keys = np.array([h["hour"] for h in hourly_aqi], dtype=np.int64)
+
+    raw = [h.get("aqi") for h in hourly_aqi]
+    valid = np.array([a is not None and a >= 0 for a in raw], dtype=bool)
+    aqi = np.array([a if ok else 0 for a, ok in zip(raw, valid)], dtype=np.float64)
+    return keys, aqi, valid
+
+
+def generate_time_windows_array(hourly_aqi: list, duration_minutes: int) -> dict:
+    hours_needed = math.ceil(duration_minutes / 60)
+
+    with metrics.span("windows.generate"):
+        keys, aqi, valid = hourly_series(hourly_aqi)
+        starts, avg_aqi = sliding_window_average(keys, aqi, valid, hours_needed)
+    metrics.incr("windows.generated", len(starts))
+    start_hour = keys[starts]
+
+    return {
+        "hours_needed": hours_needed,
+        "start_hour": start_hour,
+        "end_hour": start_hour + hours_needed,
+        "avg_aqi": avg_aqi,
+        "hours": start_hour[:, None] + np.arange(hours_needed),
+    }
+
+
+def epoch_hours(dates, hours) -> np.ndarray:
+    # "YYYY-MM-DD" dates + hour of day -> hours since 1970-01-01 00:00 (local wall clock)
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    return days * 24 + np.asarray(hours, dtype=np.int64)
+
 
-    for i in range(len(hourly_aqi) - hours_needed + 1):
-        window = hourly_aqi[i : i + hours_needed]
+def epoch_hour(dt) -> int:
+    return int(epoch_hours([dt.strftime("%Y-%m-%d")], [dt.hour])[0])
 
-        # ✅ Guard 1: consecutive hours
-        hours = [h["hour"] for h in window]
-        if hours != list(range(hours[0], hours[0] + hours_needed)):
-            continue
 
-        # ✅ Guard 2: valid AQI values
-        if any(
-            h.get("aqi") is None or h["aqi"] < 0
-            for h in window
-        ):
-            continue
+def timestamp_series(hourly_aqi: list):
+    # epoch-hour keys (sorted, unique) plus AQI values and a validity mask
+    ts = epoch_hours([h["date"] for h in hourly_aqi], [h["hour"] for h in hourly_aqi])
+    raw = [h.get("aqi") for h in hourly_aqi]
+    valid = np.array([a is not None and a >= 0 for a in raw], dtype=bool)
+    aqi = np.array([a if ok else 0 for a, ok in zip(raw, valid)], dtype=np.float64)
 
-        avg_aqi = sum(h["aqi"] for h in window) / hours_needed
-        mid_hour = sum(hours) / hours_needed
+    # sort by timestamp; for duplicate timestamps the last row wins
+    order = np.argsort(ts, kind="stable")
+    ts, aqi, valid = ts[order], aqi[order], valid[order]
+    if len(ts):
+        last = np.append(ts[1:] != ts[:-1], True)
+        ts, aqi, valid = ts[last], aqi[last], valid[last]
+    return ts, aqi, valid
 
-        windows.append({
-            "start_hour": window[0]["hour"],
-            "end_hour": window[-1]["hour"] + 1,
-            "avg_aqi": avg_aqi,
-            "hours": hours,
-        })
 
-    return windows
+def generate_windows_by_timestamp(
+    hourly_aqi: list,
+    duration_minutes: int,
+    from_ts: int = None,
+    to_ts: int = None,
+) -> dict:
+    # Multi-day engine: windows are keyed on absolute epoch hours, so they can
+    # span midnight and cover the whole forecast horizon in one pass.
+    # from_ts / to_ts (epoch hours) restrict window starts to [from_ts, to_ts).
+    hours_needed = math.ceil(duration_minutes / 60)
+
+    with metrics.span("windows.generate_by_timestamp"):
+        ts, aqi, valid = timestamp_series(hourly_aqi)
+        starts, avg_aqi = sliding_window_average(ts, aqi, valid, hours_needed)
+    metrics.incr("windows.generated", len(starts))
+    start_ts = ts[starts]
+
+    keep = np.ones(len(start_ts), dtype=bool)
+    if from_ts is not None:
+        keep &= start_ts >= from_ts
+    if to_ts is not None:
+        keep &= start_ts < to_ts
+    start_ts, avg_aqi = start_ts[keep], avg_aqi[keep]
+
+    start_hour = start_ts % 24
+    return {
+        "hours_needed": hours_needed,
+        "start_ts": start_ts,
+        "end_ts": start_ts + hours_needed,
+        "date": (start_ts // 24).astype("datetime64[D]"),
+        "start_hour": start_hour,
+        "end_hour": start_hour + hours_needed,
+        "avg_aqi": avg_aqi,
+        "time_penalty": window_mean_penalty(start_hour, hours_needed),
+    }
+
+
+def generate_minute_windows(
+    hourly_aqi: list,
+    duration_minutes: int,
+    step_minutes: int = 15,
+    from_ts: int = None,
+    to_ts: int = None,
+) -> dict:
+    # Minute-resolution windows: hourly AQI samples (taken at hh:00) are
+    # linearly interpolated and both AQI and time penalty are integrated
+    # exactly over [start, start + duration). Every window is O(1) via
+    # cumulative integrals, whatever the step size.
+    ts, aqi, valid = timestamp_series(hourly_aqi)
+    empty = np.empty(0)
+    if len(ts) < 2 or duration_minutes <= 0:
+        return {
+            "duration_minutes": duration_minutes,
+            "start_minute": empty.astype(np.int64),
+            "end_minute": empty.astype(np.int64),
+            "date": empty.astype("datetime64[D]"),
+            "start_hour": empty,
+            "avg_aqi": empty,
+            "time_penalty": empty,
+        }
+
+    knots = ts * 60
+
+    # segment j spans knots j..j+1; usable only if it is one hour long and
+    # both ends have valid AQI
+    seg_ok = (np.diff(ts) == 1) & valid[:-1] & valid[1:]
+    seg_bad = np.concatenate(([0], np.cumsum(~seg_ok)))
+
+    # AQI x minutes accumulated up to each knot (trapezoids)
+    seg_area = (aqi[:-1] + aqi[1:]) / 2 * 60
+    area = np.concatenate(([0.0], np.cumsum(np.where(seg_ok, seg_area, 0.0))))
+
+    def integral(t):
+        j = np.clip(np.searchsorted(knots, t, side="right") - 1, 0, len(ts) - 2)
+        u = t - knots[j]
+        slope = (aqi[j + 1] - aqi[j]) / 60
+        return area[j] + aqi[j] * u + slope * u * u / 2
 
+    first = knots[0] if from_ts is None else max(knots[0], from_ts * 60)
+    first = -(-first // step_minutes) * step_minutes
+    last = knots[-1] - duration_minutes
+    if to_ts is not None:
+        last = min(last, to_ts * 60 - 1)
+    start = np.arange(first, last + 1, step_minutes, dtype=np.int64)
+    end = start + duration_minutes
+
+    # every segment touched by [start, end] must be usable
+    j_start = np.searchsorted(knots, start, side="right") - 1
+    j_end = np.searchsorted(knots, end, side="left") - 1
+    keep = (seg_bad[j_end + 1] - seg_bad[j_start]) == 0
+    start, end = start[keep], end[keep]
+
+    avg_aqi = (integral(end) - integral(start)) / duration_minutes
+    time_penalty = minute_penalty_integral(start, duration_minutes) / duration_minutes
+
+    return {
+        "duration_minutes": duration_minutes,
+        "start_minute": start,
+        "end_minute": end,
+        "date": (start // (24 * 60)).astype("datetime64[D]"),
+        "start_hour": (start % (24 * 60)) / 60,
+        "avg_aqi": avg_aqi,
+        "time_penalty": time_penalty,
+    }
+
+
+def windows_to_dicts(arrays: dict) -> list:
+    hours_needed = arrays["hours_needed"]
+    return [
+        {
+            "start_hour": start,
+            "end_hour": start + hours_needed,
+            "avg_aqi": avg,
+            "hours": list(range(start, start + hours_needed)),
+        }
+        for start, avg in zip(arrays["start_hour"].tolist(), arrays["avg_aqi"].tolist())
+    ]
+
+
+def generate_window_set(hourly_aqi: list, duration_minutes: int) -> WindowSet:
+    arrays = generate_time_windows_array(hourly_aqi, duration_minutes)
+    return WindowSet.from_arrays(arrays["start_hour"], arrays["end_hour"], arrays["avg_aqi"])
+
+
+def generate_time_windows(hourly_aqi: list, duration_minutes: int):
+    # slotted Window objects; they answer the same keys the old dicts had
+    return generate_window_set(hourly_aqi, duration_minutes).to_windows()
 
 
 # import math
@@ -0,0 +1,101 @@
+import sys
+sys.path.append(".")
+
+import json
+
+import pandas as pd
+import pytest
+
+from src import aqi_api, history_store
+
+
+def _payload(base_aqi):
+    return {
+        "hourly": {
+            "time": ["2026-01-01T00:00", "2026-01-01T01:00", "2026-01-02T00:00"],
+            "us_aqi": [base_aqi, base_aqi + 1, None],
+        }
+    }
+
+
+@pytest.fixture
+def stub(stub_server):
+    # answers every coordinate in the request; records the latitudes asked for
+    seen = []
+
+    def respond(query):
+        lats = query["latitude"][0].split(",")
+        seen.append(lats)
+        payloads = [_payload(100 * (i + 1)) for i in range(len(lats))]
+        return 200, json.dumps(payloads[0] if len(payloads) == 1 else payloads).encode()
+
+    return stub_server(respond), seen
+
+
+LOCATIONS = [
+    {"name": "a", "lat": 1.0, "lon": 2.0},
+    {"name": "b", "lat": 3.0, "lon": 4.0},
+    {"name": "c", "lat": 5.0, "lon": 6.0},
+]
+
+
+def test_batch_fetch_groups_coordinates(stub):
+    url, seen = stub
+    results = aqi_api.fetch_hourly_aqi_batch(LOCATIONS, url=url, chunk_size=2)
+
+    assert seen == [["1.0", "3.0"], ["5.0"]]
+    assert [r["aqi"] for r in results["b"]] == [200, 201]
+    assert results["c"][0] == {"location": "c", "date": "2026-01-01", "hour": 0, "aqi": 100}
+
+
+def test_store_writes_snapshot_and_upserts_history(tmp_path):
+    json_path = tmp_path / "snapshot.json"
+    history_dir = tmp_path / "history"
+
+    history_store.upsert_hourly_aqi(
+        [{"location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 1}],
+        root=history_dir,
+    )
+
+    rows = [
+        {"location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 5},
+        {"location": "b", "date": "2026-01-01", "hour": 0, "aqi": 7},
+    ]
+    aqi_api.store_hourly_aqi(
+        rows,
+        json_path=json_path,
+        history_dir=history_dir,
+        arrow_path=tmp_path / "snapshot.arrow",
+        export_json=True,
+    )
+
+    assert json.loads(json_path.read_text())["data"] == rows
+    history = pd.read_parquet(history_dir).sort_values("location")
+    assert history["aqi"].tolist() == [7, 5]
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_store_is_all_or_nothing(tmp_path, monkeypatch):
+    history_dir = tmp_path / "history"
+    arrow_path = tmp_path / "snapshot.arrow"
+    old = [{"location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 1}]
+    aqi_api.store_hourly_aqi(old, history_dir=history_dir, arrow_path=arrow_path)
+    before = arrow_path.read_bytes()
+
+    def failing_json(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(aqi_api.json, "dump", failing_json)
+    with pytest.raises(OSError):
+        aqi_api.store_hourly_aqi(
+            [{"location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 9}],
+            json_path=tmp_path / "snapshot.json",
+            history_dir=history_dir,
+            arrow_path=arrow_path,
+            export_json=True,
+        )
+
+    assert history_store.load_history("delhi", root=history_dir)["aqi"].tolist() == [1]
+    assert arrow_path.read_bytes() == before
+    assert not (tmp_path / "snapshot.json").exists()
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file() and "part-" not in p.name] == ["snapshot.arrow"]
@@ -0,0 +1,100 @@
+import sys
+sys.path.append(".")
+
+import json
+import os
+import time
+
+import pytest
+
+from src.aqi_store import AQIStore
+
+
+def _write_snapshot(path, rows):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"fetched_at": "now", "data": rows}))
+    os.replace(tmp, path)
+
+
+ROWS = [
+    {"date": "2026-01-01", "hour": 0, "aqi": 10},
+    {"date": "2026-01-01", "hour": 1, "aqi": 20},
+    {"date": "2026-01-02", "hour": 0, "aqi": 30},
+]
+
+
+def test_store_groups_rows_by_date_immutably(tmp_path):
+    path = tmp_path / "aqi.json"
+    _write_snapshot(path, ROWS)
+
+    store = AQIStore(path, watch=False)
+
+    assert store.dates() == ["2026-01-01", "2026-01-02"]
+    day = store.for_date("2026-01-01")
+    assert [h["aqi"] for h in day] == [10, 20]
+    assert store.for_date("2030-01-01") == ()
+    with pytest.raises(TypeError):
+        day[0]["aqi"] = 0
+
+
+def test_store_picks_up_rewritten_snapshot(tmp_path):
+    path = tmp_path / "aqi.json"
+    _write_snapshot(path, ROWS)
+    store = AQIStore(path)
+    old_version = store.version
+
+    try:
+        _write_snapshot(path, ROWS[:1])
+        deadline = time.time() + 5
+        while store.version == old_version and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        store.stop()
+
+    assert store.version != old_version
+    assert len(store.for_date("2026-01-01")) == 1
+
+
+def test_store_keeps_last_good_snapshot(tmp_path):
+    path = tmp_path / "aqi.json"
+    _write_snapshot(path, ROWS)
+    store = AQIStore(path, watch=False)
+
+    path.write_text("{not json")
+
+    assert store.reload() is False
+    assert len(store.for_date("2026-01-01")) == 2
+
+
+from src.snapshot import ArrowSnapshot, write_arrow_snapshot
+
+
+def test_store_reads_arrow_snapshot(tmp_path):
+    path = tmp_path / "aqi.arrow"
+    rows = [dict(r, location="delhi") for r in ROWS] + [
+        {"location": "pune", "date": "2026-01-01", "hour": 0, "aqi": 99},
+    ]
+    version = write_arrow_snapshot(rows, "now", path)
+
+    snapshot = ArrowSnapshot(path)
+    assert snapshot.version == version
+    assert snapshot.table.schema.field("aqi").type == "uint16"
+
+    store = AQIStore(path, watch=False)
+    assert store.version == version
+    assert store.dates() == ["2026-01-01", "2026-01-02"]
+    assert [h["aqi"] for h in store.for_date("2026-01-01", location="delhi")] == [10, 20]
+    assert sorted(h["aqi"] for h in store.for_date("2026-01-01")) == [10, 20, 99]
+    assert store.for_date("2026-01-01", location="delhi")[0] == {
+        "location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 10,
+    }
+
+
+def test_default_store_never_serves_the_json_export(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    _write_snapshot(tmp_path / "data" / "delhi_hourly_aqi.json", ROWS)
+
+    store = AQIStore(watch=False)
+    assert store.version is None
+    assert store.for_date("2026-01-01") == ()
@@ -0,0 +1,73 @@
+import sys
+sys.path.append(".")
+
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from src import backfill
+from src.history_store import load_history
+
+
+def day_aqi(t):
+    return int(t[8:10]) * 10 + int(t[11:13])
+
+
+@pytest.fixture
+def archive(stub_server):
+    # Serves every hour in [start_date, end_date]; start dates in `broken` fail.
+    state = {"broken": set(), "ranges": []}
+
+    def respond(query):
+        start, end = query["start_date"][0], query["end_date"][0]
+        state["ranges"].append((start, end))
+        if start in state["broken"]:
+            return 400, b"{}"
+
+        day, last = date.fromisoformat(start), date.fromisoformat(end)
+        times = []
+        while day <= last:
+            times += [f"{day.isoformat()}T{h:02d}:00" for h in range(24)]
+            day += timedelta(days=1)
+        return 200, json.dumps({"hourly": {"time": times, "us_aqi": [day_aqi(t) for t in times]}}).encode()
+
+    return stub_server(respond), state
+
+
+def test_date_chunks():
+    assert backfill.date_chunks("2026-01-01", "2026-01-07", days=3) == [
+        ("2026-01-01", "2026-01-03"),
+        ("2026-01-04", "2026-01-06"),
+        ("2026-01-07", "2026-01-07"),
+    ]
+
+
+def test_backfill_resumes_from_checkpoint(archive, tmp_path):
+    url, state = archive
+    root = tmp_path / "history"
+    checkpoint = tmp_path / "checkpoint.json"
+    locations = [{"name": "delhi", "lat": 28.7, "lon": 77.1}]
+    options = dict(
+        root=root, checkpoint_path=checkpoint, url=url, chunk_days=2,
+        rate=1000, burst=100, attempts=1,
+    )
+
+    state["broken"] = {"2026-01-03"}
+    first = backfill.backfill_history(locations, "2026-01-01", "2026-01-06", **options)
+    assert first["units"] == 3 and list(first["failed"]) == ["delhi|2026-01-03|2026-01-04"]
+    assert first["rows"] == 4 * 24
+
+    state["broken"] = set()
+    state["ranges"] = []
+    second = backfill.backfill_history(locations, "2026-01-01", "2026-01-06", **options)
+    assert state["ranges"] == [("2026-01-03", "2026-01-04")]
+    assert second == {"units": 1, "skipped": 2, "rows": 48, "failed": {}}
+
+    df = load_history("delhi", root=root)
+    assert len(df) == 6 * 24
+    assert sorted(df["date"].astype(str).unique()) == [f"2026-01-0{d}" for d in range(1, 7)]
+    row = df[(df["date"] == date(2026, 1, 5)) & (df["hour"] == 7)]
+    assert row["aqi"].tolist() == [57]
+    # appended chunks are compacted into one part file per partition
+    assert len(list(root.glob("location=delhi/month=*/part-*.parquet"))) == 1
@@ -0,0 +1,40 @@
+import sys
+sys.path.append(".")
+
+import json
+
+from benchmarks.run import BASELINE_PATH, build_cases, compare_results, time_call
+from benchmarks.synthetic import all_profiles, synthetic_hourly_aqi, synthetic_locations
+
+
+def test_synthetic_generators():
+    rows = synthetic_hourly_aqi(72)
+    assert len(rows) == 72
+    assert rows[24]["date"] == "2026-01-02" and rows[24]["hour"] == 0
+    assert all(0 <= r["aqi"] <= 500 for r in rows)
+
+    assert {r["location"] for r in synthetic_locations(3, hours=24)} == {"loc0", "loc1", "loc2"}
+    assert len(all_profiles()) == 6 * 7
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"a": {"median_s": 1.0}, "b": {"median_s": 1.0}, "gone": {"median_s": 1.0}}}
+    current = {"results": {"a": {"median_s": 1.1}, "b": {"median_s": 1.5}, "new": {"median_s": 1.0}}}
+
+    rows = {r["name"]: r for r in compare_results(current, baseline, threshold=0.2)}
+
+    assert set(rows) == {"a", "b"}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"]
+
+
+def test_time_call_reports_samples():
+    result = time_call(lambda: None, repeat=3, min_time=0.001)
+    assert result["repeat"] == 3 and result["median_s"] >= 0
+
+
+def test_horizon_cases_cover_every_day():
+    cases = build_cases("quick")
+    assert len(cases["generate_time_windows/72h/60min"]()) == 3
+    assert len(cases["score_profiles/72h/all_profiles"]()) == 3
+    assert set(json.loads(BASELINE_PATH.read_text())["results"]) == set(cases)
@@ -0,0 +1,90 @@
+import sys
+sys.path.append(".")
+
+from datetime import datetime, timezone
+
+from src.climatology import ClimatologyIndex, calendar_keys, get_climatology, update_climatology
+from src.engine import IST, StaticSource, recommend
+from src.history_store import local_day_start, upsert_hourly_aqi
+from src.windows import epoch_hour
+
+
+def _history(days, aqi_for, location="delhi"):
+    # days of January 2026; aqi_for(day, hour)
+    return [
+        {"location": location, "date": f"2026-01-{d:02d}", "hour": h, "aqi": aqi_for(d, h)}
+        for d in days
+        for h in range(24)
+    ]
+
+
+def test_calendar_keys():
+    hours, weekdays, months = calendar_keys([epoch_hour(datetime(2026, 1, 5, 7))])
+    assert (hours[0], weekdays[0], months[0]) == (7, 0, 0)  # Monday in January
+
+
+def test_incremental_update_and_queries(tmp_path):
+    root = tmp_path / "history"
+    path = tmp_path / "climatology.npz"
+    upsert_hourly_aqi(_history(range(1, 22), lambda d, h: 100 + 10 * (h % 12)), root=root)
+
+    assert update_climatology(path, root=root, until=datetime(2026, 1, 15)) == 14 * 24
+    # forecast days after `until` are only counted once they are in the past
+    assert update_climatology(path, root=root, until=datetime(2026, 1, 15)) == 0
+    assert update_climatology(path, root=root, until=datetime(2026, 1, 22)) == 7 * 24
+
+    index = ClimatologyIndex.load(path)
+    assert index.watermarks["delhi"] == epoch_hour(datetime(2026, 1, 21, 23))
+    assert int(index.counts["delhi"].sum()) == 21 * 24
+
+    # three samples per weekday cell (too few), so the hour x month pool answers
+    assert index.quantile("delhi", 3, 0, 1) == 135
+    assert index.quantile("delhi", 11, 4, 1, q=0.9) == 215
+    assert index.percentile("delhi", 3, 0, 1, 80) == 0.0
+    assert index.percentile("delhi", 3, 0, 1, 135) == 0.5
+    assert index.quantile("pune", 3, 0, 1) is None
+    assert index.typical("delhi", 3, 0, 1) == (135, "hour_month")
+
+    rows = index.for_date("2026-01-26")
+    assert [r["aqi"] for r in rows[:3]] == [105, 115, 125]
+
+
+def test_engine_falls_back_to_climatology(tmp_path):
+    root = tmp_path / "history"
+    path = tmp_path / "climatology.npz"
+    upsert_hourly_aqi(_history(range(1, 29), lambda d, h: 300 - 10 * h), root=root)
+    update_climatology(path, root=root, until=datetime(2026, 1, 29))
+    climatology = get_climatology(path)
+
+    clock = lambda: datetime(2026, 1, 30, 8, 0, tzinfo=IST)
+    source = StaticSource([{"date": "2026-01-29", "hour": 0, "aqi": 50}])
+
+    assert recommend(30, "walking", source=source, clock=clock, artifact_path=None)[0] == "no_data"
+    status, ranked = recommend(30, "walking", source=source, clock=clock, artifact_path=None, fallback=climatology)
+    assert status == "climatology"
+    assert ranked.best()[0]["start_hour"] == 23
+    assert len(ranked) == 16  # hours 8..23 remain
+
+
+def test_rebuild_counts_rows_below_the_watermark(tmp_path):
+    root = tmp_path / "history"
+    path = tmp_path / "climatology.npz"
+    upsert_hourly_aqi(_history(range(10, 15), lambda d, h: 100), root=root)
+    update_climatology(path, root=root, until=datetime(2026, 1, 15))
+    before = ClimatologyIndex.load(path)
+
+    # a backfill adds older days; the watermark alone would never see them
+    upsert_hourly_aqi(_history(range(1, 10), lambda d, h: 200), root=root)
+    assert update_climatology(path, root=root, until=datetime(2026, 1, 15)) == 0
+    assert update_climatology(path, root=root, until=datetime(2026, 1, 15), rebuild=True) == 14 * 24
+    after = ClimatologyIndex.load(path)
+    assert int(after.counts["delhi"].sum()) == 14 * 24
+    # same watermarks, new counts: cached answers keyed on the version must go
+    assert after.watermarks == before.watermarks
+    assert after.version != before.version
+
+
+def test_default_until_is_the_location_local_day():
+    # 20:00 UTC on Jan 14 is already Jan 15 in Delhi
+    now = datetime(2026, 1, 14, 20, 0, tzinfo=timezone.utc)
+    assert local_day_start("delhi", now) == epoch_hour(datetime(2026, 1, 15))
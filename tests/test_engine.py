@@ -0,0 +1,62 @@
+import sys
+sys.path.append(".")
+
+from datetime import datetime
+
+from src.engine import IST, StaticSource, recommend
+from src.rec_cache import RecommendationCache
+
+
+ROWS = [
+    {"date": "2026-01-01", "hour": h, "aqi": a}
+    for h, a in enumerate([120, 110, 100, 90, 80, 70, 60, 90, 150, 200, 220, 210])
+]
+
+
+def _clock(hour, day=1):
+    return lambda: datetime(2026, 1, day, hour, 30, tzinfo=IST)
+
+
+def test_recommend_ranks_future_windows():
+    status, ranked = recommend(30, "walking", source=StaticSource(ROWS), clock=_clock(3), artifact_path=None)
+
+    assert status == "ok"
+    assert len(ranked) == 9
+    assert ranked.best()[0]["start_hour"] == 6
+    assert ranked.worst()[0]["start_hour"] == 10
+    assert [w["start_hour"] for w in ranked][:3] == [6, 7, 5]
+
+
+def test_recommend_statuses():
+    source = StaticSource(ROWS)
+
+    assert recommend(30, "walking", source=source, clock=_clock(3, day=2), artifact_path=None)[0] == "no_data"
+    assert recommend(30, "walking", source=source, clock=_clock(23), artifact_path=None)[0] == "none_remaining"
+    assert recommend(24 * 60, "walking", source=source, clock=_clock(0), artifact_path=None)[0] == "no_windows"
+
+
+def test_recommend_uses_cache():
+    cache = RecommendationCache()
+    source = StaticSource(ROWS)
+
+    first = recommend(30, "walking", source=source, clock=_clock(3), cache=cache, artifact_path=None)
+    second = recommend(30, "walking", source=source, clock=_clock(3), cache=cache, artifact_path=None)
+
+    assert first is second
+    assert cache.hits == 1
+
+
+def test_window_cache_shared_with_fallback():
+    window_cache = RecommendationCache()
+    source = StaticSource(ROWS)
+    fallback = StaticSource([dict(r, date="2026-01-02") for r in ROWS])
+
+    # alternating a day with data and one served by the fallback
+    for day in (1, 2, 1, 2, 1, 2):
+        status, _ = recommend(
+            30, "walking", source=source, clock=_clock(3, day=day), artifact_path=None,
+            window_cache=window_cache, fallback=fallback,
+        )
+        assert status == ("ok" if day == 1 else "climatology")
+
+    assert (window_cache.hits, window_cache.misses) == (4, 2)
@@ -106,3 +106,162 @@ def test_labeling_distribution():
     assert "Best" in labels
     assert "Acceptable" in labels
     assert "Avoid" in labels
+
+
+from src.windows import generate_time_windows_array
+
+def test_window_array_matches_dicts():
+    hourly = [
+        {"hour": 8, "aqi": 300},
+        {"hour": 6, "aqi": 100},
+        {"hour": 7, "aqi": None},
+        {"hour": 9, "aqi": 50},
+        {"hour": 11, "aqi": 70},
+        {"hour": 12, "aqi": 90},
+    ]
+
+    arrays = generate_time_windows_array(hourly, duration_minutes=90)
+
+    assert arrays["start_hour"].tolist() == [8, 11]
+    assert arrays["end_hour"].tolist() == [10, 13]
+    assert arrays["avg_aqi"].tolist() == [175, 80]
+    assert arrays["hours"].tolist() == [[8, 9], [11, 12]]
+    assert generate_time_windows(hourly, 90)[1]["hours"] == [11, 12]
+
+
+from src.ranker import label_array
+
+def test_label_tie_policies():
+    scores = [10, 10, 10, 10, 50]
+
+    assert label_array(scores).tolist() == ["Best"] * 4 + ["Avoid"]
+    assert label_array(scores, ties="max").tolist() == ["Avoid"] * 5
+    assert label_array(scores, ties="average").tolist() == ["Acceptable"] * 4 + ["Avoid"]
+
+    with pytest.raises(ValueError):
+        label_array(scores, ties="first")
+
+
+import math
+from src.exposure import score_profiles
+
+def test_score_profiles_matches_scalar_pipeline():
+    hourly = [{"hour": h, "aqi": 50 + 10 * h} for h in range(24) if h != 12]
+    profiles = [
+        {"duration": 30, "activity": "walking"},
+        {"duration": 90, "activity": "running"},
+        {"duration": 120, "activity": "custom", "activity_factor": 2.5},
+    ]
+
+    scored = score_profiles(hourly, profiles)
+    assert scored["exposure"].shape == (3, 23)
+
+    for p, row in zip(profiles, scored["exposure"]):
+        activity_factor = p.get("activity_factor") or get_activity_factor(p["activity"])
+        expected = {}
+        for w in generate_time_windows(hourly, p["duration"]):
+            penalties = [get_time_penalty(h) for h in w["hours"]]
+            expected[w["start_hour"]] = compute_exposure_score(
+                w["avg_aqi"],
+                get_duration_factor(p["duration"]),
+                activity_factor,
+                sum(penalties) / len(penalties),
+            )
+
+        got = {
+            int(h): e
+            for h, e in zip(scored["start_hour"], row)
+            if not math.isnan(e)
+        }
+        assert got.keys() == expected.keys()
+        for h in got:
+            assert got[h] == pytest.approx(expected[h])
+
+
+import numpy as np
+from src.penalties import (
+    duration_factor_array,
+    minute_penalty_integral,
+    time_penalty_array,
+    window_mean_penalty,
+)
+
+def test_penalty_tables_match_scalars():
+    minutes = np.arange(0, 200)
+    assert duration_factor_array(minutes).tolist() == [get_duration_factor(m) for m in minutes]
+
+    hours = [-1, 0, 5.49, 5.5, 7.49, 7.5, 9.99, 10.0, 16.9, 17.0, 20.99, 21.0, 23.5, 30]
+    assert time_penalty_array(hours).tolist() == [get_time_penalty(h) for h in hours]
+
+
+def test_window_penalty_prefix_sums():
+    for start in range(24):
+        for k in (1, 2, 5):
+            expected = sum(get_time_penalty(h % 24) for h in range(start, start + k)) / k
+            assert window_mean_penalty(start, k) == pytest.approx(expected)
+
+    # 05:00-06:00 is half 1.3 and half 0.7
+    assert minute_penalty_integral(300, 60) == pytest.approx(30 * 1.3 + 30 * 0.7)
+    # a full day, starting late in the evening, covers every band once
+    assert minute_penalty_integral(23 * 60 + 0.5, 1440) == pytest.approx(minute_penalty_integral(0, 1440))
+
+
+from src.windows import epoch_hours, generate_windows_by_timestamp
+
+def test_timestamp_windows_cross_midnight():
+    hourly = [
+        {"date": "2026-01-01", "hour": 22, "aqi": 100},
+        {"date": "2026-01-01", "hour": 23, "aqi": 200},
+        {"date": "2026-01-02", "hour": 0, "aqi": 300},
+        {"date": "2026-01-02", "hour": 2, "aqi": 50},
+        {"date": "2026-01-02", "hour": 3, "aqi": 60},
+    ]
+
+    windows = generate_windows_by_timestamp(hourly, duration_minutes=120)
+
+    assert windows["start_hour"].tolist() == [22, 23, 2]
+    assert windows["avg_aqi"].tolist() == [150, 250, 55]
+    assert windows["date"].astype(str).tolist() == ["2026-01-01", "2026-01-01", "2026-01-02"]
+    assert windows["time_penalty"][1] == pytest.approx(1.3)
+
+    day2 = epoch_hours(["2026-01-02"], [0])[0]
+    later = generate_windows_by_timestamp(hourly, 120, from_ts=day2)
+    assert later["start_ts"].tolist() == [day2 + 2]
+
+
+from src.windows import generate_minute_windows
+
+def test_minute_windows_interpolate_and_integrate():
+    hourly = [
+        {"date": "2026-01-01", "hour": 5, "aqi": 100},
+        {"date": "2026-01-01", "hour": 6, "aqi": 200},
+        {"date": "2026-01-01", "hour": 7, "aqi": 100},
+        {"date": "2026-01-01", "hour": 9, "aqi": 50},
+    ]
+
+    windows = generate_minute_windows(hourly, duration_minutes=30, step_minutes=15)
+
+    # nothing may touch the 07:00-09:00 gap
+    assert windows["start_hour"].tolist() == [5, 5.25, 5.5, 5.75, 6, 6.25, 6.5]
+    assert windows["avg_aqi"][0] == pytest.approx(125)
+    assert windows["avg_aqi"][3] == pytest.approx(187.5)
+    # 05:15-05:45 straddles the 05:30 boundary: half 1.3, half 0.7
+    assert windows["time_penalty"][1] == pytest.approx(1.0)
+    assert windows["time_penalty"][2] == pytest.approx(0.7)
+
+
+from src.ranker import RankedWindows, label_thresholds, select_best, select_worst
+
+def test_selection_matches_full_sort():
+    scores = [30, 10, 50, 10, 40, 20, 50]
+    windows = [{"exposure": s, "id": i} for i, s in enumerate(scores)]
+    reference = label_windows(sorted([dict(w) for w in windows], key=lambda x: x["exposure"]))
+
+    assert select_best(scores, 3).tolist() == [1, 3, 5]
+    assert select_worst(scores, 2).tolist() == [6, 2]
+    assert label_thresholds(scores) == (10, 30)
+
+    ranked = RankedWindows(windows)
+    assert [w["id"] for w in ranked.best(2)] == [1, 3]
+    assert ranked.worst()[0]["id"] == reference[-1]["id"]
+    assert [(w["id"], w["label"]) for w in ranked] == [(w["id"], w["label"]) for w in reference]
@@ -0,0 +1,96 @@
+import sys
+sys.path.append(".")
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.aqi_api import chunk_params
+from src.fetch_scheduler import RateLimiter, TokenBucket, call_weight, fetch_hourly_aqi_concurrent
+
+
+def _payload(base_aqi):
+    return {"hourly": {"time": ["2026-01-01T00:00", "2026-01-01T01:00"], "us_aqi": [base_aqi, base_aqi + 1]}}
+
+
+@pytest.fixture
+def flaky(stub_server):
+    # latitude 1.0 fails twice then succeeds, 9.0 always fails, others are slow
+    calls = {}
+
+    def respond(query):
+        lat = query["latitude"][0]
+        calls[lat] = calls.get(lat, 0) + 1
+        if lat == "9.0" or (lat == "1.0" and calls[lat] <= 2):
+            return 503, b"{}"
+        time.sleep(0.2)
+        return 200, json.dumps(_payload(int(float(lat)) * 10)).encode()
+
+    return stub_server(respond), calls
+
+
+def test_concurrent_fetch_retries_and_reports_partial_results(flaky):
+    url, calls = flaky
+    locations = [{"name": f"loc{i}", "lat": float(i), "lon": 0.0} for i in range(1, 10)]
+
+    start = time.perf_counter()
+    report = fetch_hourly_aqi_concurrent(
+        locations, url=url, chunk_size=1, concurrency=8, rate=1000, burst=100,
+        attempts=3, backoff=0.01, max_backoff=0.02,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert sorted(report.failed) == ["loc9"]
+    assert "503" in report.failed["loc9"]
+    assert report.results["loc1"][0] == {"location": "loc1", "date": "2026-01-01", "hour": 0, "aqi": 10}
+    assert len(report.results) == 8 and not report.complete
+    assert calls["1.0"] == 3 and calls["9.0"] == 3
+    # eight 0.2s responses in parallel, not one after another
+    assert elapsed < 1.2
+
+
+def test_token_bucket_limits_rate():
+    async def take(n):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(take(6)) >= 0.09
+
+
+def test_calls_are_weighted_by_locations_and_span():
+    chunk = [{"name": f"loc{i}", "lat": float(i), "lon": 0.0} for i in range(10)]
+
+    assert call_weight(chunk_params(chunk[:1])) == 1
+    assert call_weight(chunk_params(chunk)) == 10
+    assert call_weight(chunk_params(chunk, "2025-01-01", "2025-01-14")) == 10
+    assert call_weight(chunk_params(chunk, "2025-01-01", "2025-04-02")) == 70
+
+
+def test_token_bucket_charges_weight():
+    async def take(weights):
+        bucket = TokenBucket(rate=100, capacity=10)
+        start = time.perf_counter()
+        for w in weights:
+            await bucket.acquire(w)
+        return time.perf_counter() - start
+
+    assert asyncio.run(take([10])) < 0.05
+    # 20 tokens over a capacity of 10: the second call waits for the debt
+    assert asyncio.run(take([20, 1])) >= 0.1
+
+
+def test_rate_limiter_applies_hourly_cap():
+    now = [0.0]
+    limiter = RateLimiter(rate=1000, burst=1000, hourly=5, daily=None, clock=lambda: now[0])
+
+    async def take():
+        await limiter.acquire(5)
+        return limiter.buckets[1].tokens
+
+    assert asyncio.run(take()) == 0
+    assert [b.rate for b in limiter.buckets] == [1000, 5 / 3600]
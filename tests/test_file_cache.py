@@ -0,0 +1,37 @@
+import sys
+sys.path.append(".")
+
+import os
+
+from src.climatology import get_climatology
+from src.file_cache import load_cached
+from src.precompute import load_recommendations
+from src.sketch import get_score_sketches
+
+
+def test_load_cached_reloads_on_change(tmp_path):
+    path = tmp_path / "value.txt"
+    calls = []
+
+    def loader(p):
+        calls.append(p)
+        return p.read_text()
+
+    assert load_cached(path, loader) is None
+    path.write_text("one")
+    assert load_cached(path, loader) == "one"
+    assert load_cached(path, loader) == "one"
+    assert len(calls) == 1
+
+    path.write_text("two")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+    assert load_cached(path, loader) == "two"
+
+
+def test_corrupt_files_load_as_missing(tmp_path):
+    for name in ("climatology.npz", "sketches.json", "recommendations.json"):
+        (tmp_path / name).write_bytes(b"\x00half-written")
+
+    assert get_climatology(tmp_path / "climatology.npz") is None
+    assert get_score_sketches(tmp_path / "sketches.json") is None
+    assert load_recommendations("2026-01-01", 30, "walking", 0, path=tmp_path / "recommendations.json") is None
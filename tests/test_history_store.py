@@ -0,0 +1,159 @@
+import sys
+sys.path.append(".")
+
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src import metrics
+from src.history_store import (
+    SCHEMA_VERSION,
+    append_hourly_aqi,
+    compact_history,
+    discard_staged,
+    import_legacy_parquet,
+    load_history,
+    load_history_after,
+    partition_dir,
+    stage_hourly_aqi,
+    upsert_hourly_aqi,
+)
+
+
+def _rows(date, values, location="delhi"):
+    return [
+        {"location": location, "date": date, "hour": h, "aqi": v}
+        for h, v in enumerate(values)
+    ]
+
+
+def test_upsert_touches_only_fetched_partitions(tmp_path):
+    upsert_hourly_aqi(_rows("2026-01-31", [1, 2]) + _rows("2026-02-01", [3, 4]), root=tmp_path)
+    january = list(partition_dir("delhi", "2026-01-31", tmp_path).iterdir())
+
+    upsert_hourly_aqi(_rows("2026-02-01", [30, 40, 50]), root=tmp_path)
+
+    assert list(partition_dir("delhi", "2026-01", tmp_path).iterdir()) == january
+    history = load_history("delhi", root=tmp_path)
+    assert history["aqi"].tolist() == [1, 2, 30, 40, 50]
+    assert history["hour"].tolist() == [0, 1, 0, 1, 2]
+
+
+def test_part_files_use_compact_schema(tmp_path):
+    upsert_hourly_aqi(
+        [{"location": "delhi", "date": f"2026-01-{d:02d}", "hour": h, "aqi": 300 - h}
+         for d in range(31, 0, -1) for h in range(24)],
+        root=tmp_path,
+    )
+    (path,) = partition_dir("delhi", "2026-01", tmp_path).glob("*.parquet")
+    f = pq.ParquetFile(path)
+
+    assert f.schema_arrow.field("epoch_hour").type == pa.int32()
+    assert f.schema_arrow.field("aqi").type == pa.uint16()
+    assert f.schema_arrow.metadata[b"wtgo.schema_version"] == SCHEMA_VERSION.encode()
+    assert f.metadata.num_rows == 31 * 24 and f.metadata.num_row_groups == 1
+    # sorted by epoch_hour; statistics bound the month for range pruning
+    stats = f.metadata.row_group(0).column(0).statistics
+    assert stats.max - stats.min == 31 * 24 - 1
+    epoch = pq.read_table(path)["epoch_hour"].to_pylist()
+    assert epoch == sorted(epoch)
+
+
+def test_compaction_merges_appended_files(tmp_path):
+    append_hourly_aqi(_rows("2026-01-01", [1, 2]), root=tmp_path)
+    append_hourly_aqi(_rows("2026-01-01", [9]), root=tmp_path)
+    part = partition_dir("delhi", "2026-01-01", tmp_path)
+    assert len(list(part.glob("*.parquet"))) == 2
+
+    assert compact_history(tmp_path) == 1
+    assert compact_history(tmp_path) == 0
+
+    assert len(list(part.glob("*.parquet"))) == 1
+    assert pd.read_parquet(tmp_path)["aqi"].tolist() == [9, 2]
+
+
+def test_import_legacy_parquet(tmp_path):
+    legacy = tmp_path / "legacy.parquet"
+    pd.DataFrame(_rows("2026-01-01", [5, 6])).drop(columns="location").to_parquet(legacy)
+
+    assert import_legacy_parquet(legacy, root=tmp_path / "history") == 2
+    assert partition_dir("delhi", "2026-01-01", tmp_path / "history").exists()
+
+
+def test_load_history_prunes_and_projects(tmp_path):
+    for loc in ["delhi", "new york"]:
+        for day in range(1, 10):
+            upsert_hourly_aqi(_rows(f"2026-01-0{day}", [day * 100 + h for h in range(24)], loc), root=tmp_path)
+    # an uncompacted partition: the later part file wins
+    append_hourly_aqi(_rows("2026-01-04", [7]), root=tmp_path)
+
+    metrics.enable(tmp_path / "m.jsonl")
+    try:
+        week = load_history("delhi", "2026-01-03", date(2026, 1, 5), root=tmp_path)
+        scans = metrics.snapshot()["spans"]["history.load"]["count"]
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    assert scans == 1
+    assert len(week) == 72 and set(week["location"]) == {"delhi"}
+    assert week["date"].iloc[0] == date(2026, 1, 3)
+    assert week[week["date"] == date(2026, 1, 4)]["aqi"].tolist()[:2] == [7, 401]
+
+    evening = load_history(
+        "new york", datetime(2026, 1, 8, 22), datetime(2026, 1, 9, 1),
+        columns=["aqi"], root=tmp_path,
+    )
+    assert list(evening.columns) == ["aqi"]
+    assert evening["aqi"].tolist() == [822, 823, 900, 901]
+
+    assert len(load_history(root=tmp_path)) == 2 * 9 * 24
+    assert load_history("pune", root=tmp_path).empty
+
+
+def test_invalid_aqi_is_dropped_not_clipped(tmp_path):
+    upsert_hourly_aqi(
+        [
+            {"location": "delhi", "date": "2026-01-01", "hour": 0, "aqi": 80},
+            {"location": "delhi", "date": "2026-01-01", "hour": 1, "aqi": -1},
+            {"location": "delhi", "date": "2026-01-01", "hour": 2, "aqi": None},
+            {"location": "delhi", "date": "2026-01-01", "hour": 3, "aqi": 70000},
+        ],
+        root=tmp_path,
+    )
+
+    df = load_history("delhi", columns=["hour", "aqi"], root=tmp_path)
+    assert df["hour"].tolist() == [0] and df["aqi"].tolist() == [80]
+
+
+def test_uncompacted_partition_dedupes_next_to_empty_one(tmp_path):
+    append_hourly_aqi(_rows("2026-02-01", [100, 100]), root=tmp_path)
+    append_hourly_aqi(_rows("2026-02-01", [200, 200]), root=tmp_path)
+    partition_dir("delhi", "2026-03", tmp_path).mkdir()
+
+    history = load_history("delhi", root=tmp_path)
+    assert history["aqi"].tolist() == [200, 200]
+
+
+def test_discard_removes_partitions_it_created(tmp_path):
+    upsert_hourly_aqi(_rows("2026-02-01", [1]), root=tmp_path)
+    staged = stage_hourly_aqi(_rows("2026-02-02", [2]) + _rows("2026-03-01", [3]), root=tmp_path)
+    discard_staged(staged)
+
+    assert not partition_dir("delhi", "2026-03", tmp_path).exists()
+    assert len(list(partition_dir("delhi", "2026-02", tmp_path).iterdir())) == 1
+    assert load_history("delhi", root=tmp_path)["aqi"].tolist() == [1]
+
+
+def test_load_history_after_watermark(tmp_path):
+    upsert_hourly_aqi(_rows("2026-01-01", [1, 2, 3]) + _rows("2026-01-02", [4, 5]), root=tmp_path)
+    first = load_history("delhi", columns=["epoch_hour"], root=tmp_path)["epoch_hour"].min()
+
+    df = load_history_after("delhi", int(first), until=datetime(2026, 1, 2, 1), columns=["aqi"], root=tmp_path)
+    assert list(df.columns) == ["epoch_hour", "aqi"]
+    assert df["aqi"].tolist() == [2, 3, 4]
+
+    caught_up = load_history_after("delhi", int(first) + 30, until=datetime(2026, 1, 2), root=tmp_path)
+    assert caught_up.empty
@@ -0,0 +1,37 @@
+import sys
+sys.path.append(".")
+
+import io
+import json
+
+from main import run_batch
+from src.engine import StaticSource
+
+
+ROWS = [
+    {"location": loc, "date": "2026-01-01", "hour": h, "aqi": 50 + 10 * h + offset}
+    for loc, offset in [("delhi", 0), ("pune", -40)]
+    for h in range(24)
+]
+
+
+def test_batch_streams_one_answer_per_query():
+    queries = [
+        {"id": 1, "location": "delhi", "duration": 30, "activity": "walking", "time": "2026-01-01T08:10"},
+        {"id": 2, "location": "delhi", "duration": 30, "activity": "walking", "time": "2026-01-01T20:00+05:30"},
+        {"id": 3, "location": "pune", "duration": 60, "activity": "running", "time": "2026-01-01T00:00"},
+        {"id": 4, "location": "delhi", "duration": 30, "activity": "walking", "time": "2026-03-01T08:00"},
+        {"id": 5, "duration": 30},
+    ]
+    lines = [json.dumps(q) for q in queries] + ["", "not json"]
+    out = io.StringIO()
+
+    assert run_batch(lines, out, source=StaticSource(ROWS), top=2) == 6
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get("status") for r in results] == ["ok", "ok", "ok", "no_data", None, None]
+    assert results[0]["best"][0]["start_hour"] >= 8 and len(results[0]["best"]) == 2
+    assert results[1]["best"][0]["start_hour"] == 21
+    assert results[2]["best"][0]["label"] == "Best"
+    assert "KeyError" in results[4]["error"]
+    assert results[5]["line"] == 7
@@ -0,0 +1,74 @@
+import sys
+sys.path.append(".")
+
+import json
+
+import pytest
+
+from src import metrics
+from src.windows import generate_time_windows
+
+
+@pytest.fixture
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_spans_are_shared_noops(clean_metrics):
+    assert metrics.span("anything") is metrics.NULL_SPAN
+    metrics.incr("anything")
+    assert metrics.snapshot() == {"counters": {}, "spans": {}}
+
+
+def test_jsonl_export(tmp_path, clean_metrics):
+    path = tmp_path / "metrics.jsonl"
+    metrics.enable(path)
+
+    generate_time_windows([{"hour": 6, "aqi": 100}, {"hour": 7, "aqi": 200}], 60)
+    with pytest.raises(RuntimeError):
+        with metrics.span("failing", stage="test"):
+            raise RuntimeError
+    metrics.flush()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines[0]["span"] == "windows.generate"
+    assert lines[1] == {**lines[1], "span": "failing", "stage": "test", "error": "RuntimeError"}
+    assert lines[-1]["counters"] == {"windows.generated": 2}
+
+
+def test_prometheus_export(tmp_path, clean_metrics):
+    path = tmp_path / "metrics.prom"
+    metrics.enable(path)
+
+    with metrics.span("engine.score"):
+        pass
+    metrics.incr("aqi_api.requests", 3)
+    metrics.flush()
+
+    text = path.read_text()
+    assert 'wtgo_span_seconds_count{span="engine.score"} 1' in text
+    assert "wtgo_aqi_api_requests_total 3" in text
+
+
+def test_profiled_writes_stats(tmp_path):
+    path = tmp_path / "run.prof"
+    with metrics.profiled(path):
+        sum(range(1000))
+    assert path.stat().st_size > 0
+
+
+def test_events_are_flushed_before_exit(tmp_path, clean_metrics, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    metrics.enable(path)
+    monkeypatch.setattr(metrics, "FLUSH_EVENTS", 10)
+
+    for _ in range(25):
+        with metrics.span("request"):
+            pass
+
+    assert len(metrics._events) == 5
+    spans = [json.loads(line) for line in path.read_text().splitlines() if "span" in line]
+    assert len(spans) == 20
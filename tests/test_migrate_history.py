@@ -0,0 +1,58 @@
+import sys
+sys.path.append(".")
+
+import json
+
+import pandas as pd
+import pyarrow as pa
+
+from jobs.migrate_history_v2 import run
+from src.climatology import ClimatologyIndex
+from src.history_store import load_history
+from src.snapshot import ArrowSnapshot
+
+
+def _v1_part(root, location, day, hours, aqi, name):
+    part = root / f"location={location}" / f"date={day}"
+    part.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"hour": hours, "aqi": aqi}).to_parquet(part / f"part-{name}.parquet", index=False)
+
+
+def test_migration_to_v2(tmp_path):
+    root = tmp_path / "history"
+    legacy = tmp_path / "legacy.parquet"
+    json_path = tmp_path / "snapshot.json"
+    arrow_path = tmp_path / "snapshot.arrow"
+
+    pd.DataFrame({"date": ["2025-12-31", "2026-01-01"], "hour": [0, 0], "aqi": [1, 2]}).to_parquet(legacy)
+    json_path.write_text(json.dumps({
+        "fetched_at": "2026-01-02T00:00:00",
+        "data": [{"date": "2026-01-01", "hour": 0, "aqi": 20}, {"date": "2026-01-01", "hour": 1, "aqi": 21}],
+    }))
+    _v1_part(root, "delhi", "2026-01-01", [1, 2], [210, 220], "1")
+    _v1_part(root, "delhi", "2026-01-01", [2], [222], "2")
+    _v1_part(root, "new%20york", "2026-01-02", [5], [50], "1")
+
+    paths = dict(
+        root=root, legacy_parquet=legacy, json_path=json_path, arrow_path=arrow_path,
+        climatology_path=tmp_path / "climatology.npz",
+        sketches_path=tmp_path / "sketches.json",
+    )
+    assert run(remove_legacy=True, **paths)
+    assert not run(**paths)
+
+    history = load_history(root=root)
+    assert history.to_dict("list") == {
+        "location": ["delhi", "delhi", "delhi", "delhi", "new york"],
+        "date": [pd.Timestamp(d).date() for d in ["2025-12-31", "2026-01-01", "2026-01-01", "2026-01-01", "2026-01-02"]],
+        "hour": [0, 0, 1, 2, 5],
+        "aqi": [1, 20, 210, 222, 50],
+    }
+    assert not list(root.glob("location=*/date=*")) and not legacy.exists()
+    # every imported (past) row is counted, not just those past a watermark
+    climatology = ClimatologyIndex.load(tmp_path / "climatology.npz")
+    assert {loc: int(c.sum()) for loc, c in climatology.counts.items()} == {"delhi": 4, "new york": 1}
+
+    snapshot = ArrowSnapshot(arrow_path)
+    assert snapshot.table.schema.field("aqi").type == pa.uint16()
+    assert [r["aqi"] for r in snapshot.rows("delhi", "2026-01-01")] == [20, 21]
@@ -0,0 +1,85 @@
+import sys
+sys.path.append(".")
+
+import json
+import random
+
+from src.aqi_store import AQIStore
+from src.exposure import compute_exposure_score
+from src.penalties import get_activity_factor, get_duration_factor, get_time_penalty
+from src.precompute import load_recommendations, write_recommendation_artifact
+from src.ranker import label_windows
+from src.windows import generate_time_windows
+
+
+def _reference(hourly_aqi, duration, activity, current_hour):
+    windows = generate_time_windows(hourly_aqi, duration)
+    if not windows:
+        return "no_windows", ()
+    for w in windows:
+        penalties = [get_time_penalty(h) for h in w["hours"]]
+        w["exposure"] = compute_exposure_score(
+            w["avg_aqi"],
+            get_duration_factor(duration),
+            get_activity_factor(activity),
+            sum(penalties) / len(penalties),
+        )
+    max_exposure = max(w["exposure"] for w in windows)
+    for w in windows:
+        w["NormalizedScore"] = round((w["exposure"] / max_exposure) * 100, 1)
+    windows = [w for w in windows if w["start_hour"] >= current_hour]
+    if not windows:
+        return "none_remaining", ()
+    return "ok", tuple(label_windows(sorted(windows, key=lambda x: x["exposure"])))
+
+
+def test_artifact_matches_live_pipeline(tmp_path):
+    rng = random.Random(7)
+    rows = [
+        {"date": day, "hour": h, "aqi": rng.randint(40, 300)}
+        for day in ["2026-01-01", "2026-01-02"]
+        for h in range(24)
+        if not (day == "2026-01-02" and h == 12)
+    ]
+    json_path = tmp_path / "aqi.json"
+    json_path.write_text(json.dumps({"fetched_at": "x", "data": rows}))
+    artifact_path = tmp_path / "recs.json"
+
+    artifact = write_recommendation_artifact(AQIStore(json_path, watch=False), artifact_path)
+
+    for day in ["2026-01-01", "2026-01-02"]:
+        day_rows = [r for r in rows if r["date"] == day]
+        for activity in ["walking", "running"]:
+            for hour in [0, 7, 23]:
+                got = load_recommendations(
+                    day, 60, activity, hour,
+                    version=artifact["source_version"], path=artifact_path,
+                )
+                status, ranked = got
+                assert (status, tuple(ranked)) == _reference(day_rows, 60, activity, hour)
+
+
+def test_stale_or_missing_artifact_is_ignored(tmp_path):
+    json_path = tmp_path / "aqi.json"
+    json_path.write_text(json.dumps({"data": [{"date": "2026-01-01", "hour": 0, "aqi": 5}]}))
+    artifact_path = tmp_path / "recs.json"
+    write_recommendation_artifact(AQIStore(json_path, watch=False), artifact_path)
+
+    assert load_recommendations("2026-01-01", 30, "walking", 0, version="other", path=artifact_path) is None
+    assert load_recommendations("2026-01-05", 30, "walking", 0, path=artifact_path) is None
+    assert load_recommendations("2026-01-01", 30, "walking", 0, path=tmp_path / "nope.json") is None
+    assert load_recommendations("2026-01-01", 30, "walking", 1, path=artifact_path) == ("none_remaining", ())
+
+
+def test_aliases_share_one_profile(tmp_path):
+    json_path = tmp_path / "aqi.json"
+    rows = [{"date": "2026-01-01", "hour": h, "aqi": 50 + 7 * h} for h in range(24)]
+    json_path.write_text(json.dumps({"data": rows}))
+    artifact_path = tmp_path / "recs.json"
+    artifact = write_recommendation_artifact(AQIStore(json_path, watch=False), artifact_path)
+
+    profiles = artifact["locations"]["delhi"]["2026-01-01"]
+    assert sorted(profiles) == sorted(f"{d}|{a}" for d in [15, 30, 45, 60] for a in ["errands", "walking", "brisk walk", "running"])
+    _, workout = load_recommendations("2026-01-01", 30, "workout", 0, path=artifact_path)
+    _, running = load_recommendations("2026-01-01", 30, "running", 0, path=artifact_path)
+    assert list(workout) == list(running)
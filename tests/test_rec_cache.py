@@ -0,0 +1,33 @@
+import sys
+sys.path.append(".")
+
+from src.rec_cache import RecommendationCache
+
+
+def test_cache_hits_and_lru_eviction():
+    cache = RecommendationCache(maxsize=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key
+
+    assert cache.get_or_compute("v1", 30, "walking", 8, compute=compute("a")) == "a"
+    assert cache.get_or_compute("v1", 30, "walking", 8, compute=compute("x")) == "a"
+    cache.get_or_compute("v1", 60, "running", 8, compute=compute("b"))
+    cache.get_or_compute("v1", 30, "walking", 8, compute=compute("x"))
+    cache.get_or_compute("v1", 15, "walking", 9, compute=compute("c"))
+
+    # ("b") was least recently used and got evicted
+    assert cache.get("v1", 60, "running", 8) is None
+    assert cache.get("v1", 30, "walking", 8) == "a"
+    assert calls == ["a", "b", "c"]
+    assert cache.hits == 3
+
+
+def test_new_snapshot_version_invalidates():
+    cache = RecommendationCache()
+    cache.put("v1", 30, "walking", 8, value="old")
+
+    assert cache.get("v2", 30, "walking", 8) is None
+    assert len(cache) == 0
+    assert cache.get("v1", 30, "walking", 8) is None
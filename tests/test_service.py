@@ -0,0 +1,46 @@
+import sys
+sys.path.append(".")
+
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+
+from src.engine import StaticSource
+from src.service import make_app
+
+
+ROWS = [
+    {"date": "2026-01-01", "hour": h, "aqi": a}
+    for h, a in enumerate([120, 110, 100, 90, 80, 70, 60, 90, 150, 200, 220, 210])
+]
+
+
+class ServiceTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return make_app(source=StaticSource(ROWS))
+
+    def test_recommend_and_etag(self):
+        url = "/recommend?duration=30&activity=walking&time=2026-01-01T03:30&top=2"
+        response = self.fetch(url)
+        assert response.code == 200
+        body = json.loads(response.body)
+        assert body["status"] == "ok"
+        assert [w["start_hour"] for w in body["best"]] == [6, 7]
+        assert body["worst"]["start_hour"] == 10
+
+        etag = response.headers["ETag"]
+        # same hour, same profile -> same cached answer
+        again = self.fetch(url.replace("03:30", "03:05"), headers={"If-None-Match": etag})
+        assert again.code == 304
+
+        later = self.fetch(url.replace("03:30", "08:00"), headers={"If-None-Match": etag})
+        assert later.code == 200
+        assert later.headers["ETag"] != etag
+
+    def test_statuses_and_errors(self):
+        no_data = json.loads(self.fetch("/recommend?time=2026-02-01T08:00").body)
+        assert no_data["status"] == "no_data"
+
+        assert self.fetch("/recommend?activity=flying").code == 400
+        assert self.fetch("/recommend?duration=abc").code == 400
+        assert self.fetch("/health").code == 200
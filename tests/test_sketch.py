@@ -0,0 +1,154 @@
+import sys
+sys.path.append(".")
+
+import asyncio
+import io
+import json
+from datetime import datetime
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+from main import answer_query, run_batch
+from src.climatology import get_climatology, update_climatology
+from src.engine import IST, StaticSource, recommend, recommendation_json
+from src.history_store import upsert_hourly_aqi
+from src.service import make_app
+from src.sketch import KLLSketch, ScoreSketches, get_score_sketches, update_score_sketches
+
+
+def test_kll_sketch_ranks_merges_and_round_trips():
+    values = np.random.default_rng(7).lognormal(5, 0.6, 50000)
+    first, second = KLLSketch(k=128), KLLSketch(k=128)
+    first.extend(values[:30000])
+    for v in values[30000:]:
+        second.update(v)
+
+    merged = first.merge(second)
+    assert merged.n == 50000
+    assert sum(len(items) for items in merged.levels) < 600
+
+    restored = KLLSketch.from_dict(json.loads(json.dumps(merged.to_dict())))
+    for q in (0.1, 0.2, 0.5, 0.9):
+        assert abs(restored.rank(np.quantile(values, q)) - q) < 0.03
+        assert abs(np.mean(values <= restored.quantile(q)) - q) < 0.03
+
+
+def _day(day, base, location="delhi"):
+    return [
+        {"location": location, "date": day, "hour": h, "aqi": base + 5 * abs(12 - h)}
+        for h in range(24)
+    ]
+
+
+def test_long_run_labels(tmp_path):
+    root = tmp_path / "history"
+    path = tmp_path / "sketches.json"
+    for d in range(1, 31):
+        upsert_hourly_aqi(_day(f"2026-01-{d:02d}", 100 + d), root=root)
+
+    assert update_score_sketches(path, root=root, until=datetime(2026, 1, 20)) == 19
+    assert update_score_sketches(path, root=root, until=datetime(2026, 1, 31)) == 11
+    sketches = get_score_sketches(path)
+    assert sketches.sketches["delhi|30|walking"].n == 30 * 24
+    assert ScoreSketches.load(path).version == sketches.version
+
+    clock = lambda: datetime(2026, 2, 1, 0, 0, tzinfo=IST)
+    dirty = StaticSource(_day("2026-02-01", 400))
+    clean = StaticSource(_day("2026-02-01", 0))
+
+    # day-relative labels always find a "Best" window
+    status, ranked = recommend(30, "walking", source=dirty, clock=clock, artifact_path=None)
+    assert ranked.best()[0]["label"] == "Best"
+
+    status, ranked = recommend(30, "walking", source=dirty, clock=clock, artifact_path=None, sketches=sketches)
+    assert status == "ok" and {w["label"] for w in ranked} == {"Avoid"}
+
+    status, ranked = recommend(30, "walking", source=clean, clock=clock, artifact_path=None, sketches=sketches)
+    assert {w["label"] for w in ranked} == {"Best"}
+
+    # too little history for a profile -> day-relative labels
+    status, ranked = recommend(60, "running", source=dirty, clock=clock, artifact_path=None,
+                               sketches=ScoreSketches(sketches={}, watermarks={"delhi": 1}))
+    assert ranked.labeler is None
+
+
+def test_rebuild_and_aliases(tmp_path):
+    root = tmp_path / "history"
+    path = tmp_path / "sketches.json"
+    for d in range(20, 31):
+        upsert_hourly_aqi(_day(f"2026-01-{d:02d}", 100), root=root)
+    update_score_sketches(path, root=root, until=datetime(2026, 1, 31))
+    before = ScoreSketches.load(path)
+
+    # backfilled days sit below the watermark; only a rebuild sketches them
+    for d in range(1, 20):
+        upsert_hourly_aqi(_day(f"2026-01-{d:02d}", 200), root=root)
+    assert update_score_sketches(path, root=root, until=datetime(2026, 1, 31)) == 0
+    assert update_score_sketches(path, root=root, until=datetime(2026, 1, 31), rebuild=True) == 30
+
+    sketches = ScoreSketches.load(path)
+    assert sketches.watermarks == before.watermarks
+    assert sketches.version != before.version
+    assert len(sketches.sketches) == 4 * 4
+    assert sketches.sketches["delhi|30|walking"].n == 30 * 24
+    assert sketches.get("delhi", 30, "workout") is sketches.get("delhi", 30, "running")
+    assert sketches.get("delhi", 30, "standing/errands") is sketches.sketches["delhi|30|errands"]
+
+
+def test_front_ends_label_like_the_app(tmp_path):
+    root = tmp_path / "history"
+    for d in range(1, 31):
+        upsert_hourly_aqi(_day(f"2026-01-{d:02d}", 100 + d), root=root)
+    update_score_sketches(tmp_path / "sketches.json", root=root, until=datetime(2026, 1, 31))
+    update_climatology(tmp_path / "climatology.npz", root=root, until=datetime(2026, 1, 31))
+    sketches = get_score_sketches(tmp_path / "sketches.json")
+    climatology = get_climatology(tmp_path / "climatology.npz")
+    source = StaticSource(_day("2026-02-01", 400))
+
+    # 02-01 is labelled by the sketches, 02-02 has no data and falls back
+    queries = [
+        {"location": "delhi", "duration": 30, "activity": "walking", "time": "2026-02-01T00:00"},
+        {"location": "delhi", "duration": 60, "activity": "running", "time": "2026-02-02T05:00"},
+    ]
+    expected = []
+    for q in queries:
+        when = datetime.fromisoformat(q["time"]).replace(tzinfo=IST)
+        status, ranked = recommend(
+            q["duration"], q["activity"], source=source, clock=lambda: when, location=q["location"],
+            fallback=climatology, sketches=sketches,
+        )
+        expected.append(recommendation_json(status, ranked, 3))
+    assert expected[0]["best"][0]["label"] == "Avoid"
+    assert expected[1]["status"] == "climatology"
+
+    cli = [answer_query(q, source, fallback=climatology, sketches=sketches) for q in queries]
+
+    out = io.StringIO()
+    run_batch([json.dumps(q) for q in queries], out, source=source, fallback=climatology, sketches=sketches)
+    batch = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    async def serve():
+        sock, port = bind_unused_port()
+        server = HTTPServer(make_app(
+            source=source, load_fallback=lambda: climatology, load_sketches=lambda: sketches,
+        ))
+        server.add_sockets([sock])
+        try:
+            return [
+                json.loads((await AsyncHTTPClient().fetch(
+                    f"http://127.0.0.1:{port}/recommend?location={q['location']}&duration={q['duration']}"
+                    f"&activity={q['activity']}&time={q['time']}"
+                )).body)
+                for q in queries
+            ]
+        finally:
+            server.stop()
+
+    service = asyncio.run(serve())
+
+    for answers in (cli, batch, service):
+        for answer, want in zip(answers, expected):
+            assert {k: answer[k] for k in want} == want
@@ -0,0 +1,62 @@
+import sys
+sys.path.append(".")
+
+import numpy as np
+import pytest
+
+from src.ranker import RankedWindows, label_windows
+from src.window_set import Window, WindowSet
+
+
+def test_window_behaves_like_the_old_dict():
+    w = Window(6, 8, 150.0)
+
+    assert w["hours"] == [6, 7]
+    assert w == {"start_hour": 6, "end_hour": 8, "avg_aqi": 150.0, "hours": [6, 7]}
+    with pytest.raises(KeyError):
+        w["exposure"]
+
+    w["exposure"] = 42.0
+    assert w.get("exposure") == 42.0
+    assert "exposure" in w
+    with pytest.raises(AttributeError):
+        w.extra = 1
+
+
+def test_window_set_views_share_memory():
+    ws = WindowSet.from_arrays([6, 7, 8], [7, 8, 9], [100.0, 200.0, 300.0])
+
+    tail = ws[1:]
+    tail["exposure"] = [1.0, 2.0]
+    assert np.isnan(ws["exposure"][0])
+    assert ws["exposure"][1:].tolist() == [1.0, 2.0]
+    assert np.shares_memory(tail.data, ws.data)
+
+    ws["label"] = ["Best", "Acceptable", "Avoid"]
+    assert ws[2]["label"] == "Avoid"
+    assert ws.labels.tolist() == ["Best", "Acceptable", "Avoid"]
+
+
+def test_window_set_round_trips_labelled_windows():
+    windows = label_windows([Window(h, h + 1, float(h), exposure=float(h)) for h in range(5)])
+
+    ws = WindowSet.from_windows(windows)
+
+    assert ws.to_windows() == windows
+    assert ws.to_dicts()[0]["label"] == "Best"
+
+
+def test_ranked_window_set_materialises_only_returned_windows(monkeypatch):
+    scores = [30.0, 10.0, 50.0, 10.0, 40.0, 20.0, 50.0]
+    ws = WindowSet.from_arrays(range(7), range(1, 8), [100.0] * 7, scores)
+    reference = RankedWindows(ws.to_windows())
+
+    made = []
+    window = WindowSet._window
+    monkeypatch.setattr(WindowSet, "_window", lambda self, row: made.append(row) or window(self, row))
+
+    ranked = RankedWindows(ws)
+    assert ranked.best(2) == reference.best(2)
+    assert ranked.worst() == reference.worst()
+    assert len(made) == 3
+    assert list(ranked) == list(reference)